@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Adjust sys.path to include the scrape stage directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/scrape')))
+
+from utils.history_db import open_history_db, keyword_condition
+
+WEBKIT_2025 = 13_380_000_000_000_000
+# Topics spread over titles and paths so a keyword export selects only part of the profile
+TOPICS = ['politics', 'sports', 'weather', 'technology', 'travel', 'science', 'music', 'food']
+
+def make_chrome_profile(path, n_urls, visits_per_url=3, seed=42):
+    """Write a synthetic Chrome History database with urls and visits tables."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE urls (id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+                           visit_count INTEGER, last_visit_time INTEGER);
+        CREATE TABLE visits (id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER);
+    """)
+    urls, visits = [], []
+    for i in range(1, n_urls + 1):
+        last = WEBKIT_2025 + rng.randint(0, 10**13)
+        topic = rng.choice(TOPICS)
+        urls.append((i, f"https://site{i % 500}.example.com/{topic}/article-{i}", f"Article {i} about {topic}",
+                     visits_per_url, last))
+        visits.extend((i, last - k * 1_000_000) for k in range(visits_per_url))
+    conn.executemany("INSERT INTO urls VALUES (?, ?, ?, ?, ?)", urls)
+    conn.executemany("INSERT INTO visits (url, visit_time) VALUES (?, ?)", visits)
+    conn.commit()
+    conn.close()
+
+def time_read(history_path, read_mode):
+    """Open the database with read_mode, run the extraction join, and return (open, total) seconds."""
+    start = time.perf_counter()
+    conn, cleanup = open_history_db(history_path, read_mode)
+    opened = time.perf_counter() - start
+    try:
+        conn.execute("""
+            SELECT urls.url, urls.title, urls.last_visit_time
+            FROM urls JOIN visits ON urls.id = visits.url
+        """).fetchall()
+    finally:
+        conn.close()
+        cleanup()
+    return opened, time.perf_counter() - start
+
+def time_keyword_query(history_path, keywords):
+    """Run the keyword-filtered per-URL query the export uses and return (seconds, rows)."""
+    condition, params = keyword_condition(keywords, ['urls.title', 'urls.url'])
+    start = time.perf_counter()
+    conn, cleanup = open_history_db(history_path, 'direct')
+    try:
+        rows = conn.execute(f"""
+            SELECT urls.url, urls.title, COUNT(visits.id), MIN(visits.visit_time), MAX(visits.visit_time)
+            FROM urls JOIN visits ON urls.id = visits.url
+            WHERE {condition}
+            GROUP BY urls.id
+        """, params).fetchall()
+    finally:
+        conn.close()
+        cleanup()
+    return time.perf_counter() - start, len(rows)
+
+def run(n_urls, repeats, keywords):
+    """Compare copy, backup and in-place reads of a synthetic profile, then time a keyword export."""
+    with tempfile.TemporaryDirectory() as tmp:
+        history_path = os.path.join(tmp, 'History')
+        make_chrome_profile(history_path, n_urls)
+        size_mb = os.path.getsize(history_path) / 2**20
+        print(f"profile: {n_urls} urls, {size_mb:.1f} MB")
+        for read_mode in ['copy', 'backup', 'direct']:
+            opened, total = min(time_read(history_path, read_mode) for _ in range(repeats))
+            print(f"{read_mode:>6}: open {opened * 1000:8.1f} ms  open + query {total * 1000:8.1f} ms")
+        seconds, rows = min(time_keyword_query(history_path, keywords) for _ in range(repeats))
+        print(f"keywords {','.join(keywords)}: {seconds * 1000:8.1f} ms for {rows} urls")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark copying vs reading browser history in place.")
+    parser.add_argument('--urls', type=int, default=500_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--keywords', nargs='+', default=['politics', 'news'])
+    args = parser.parse_args()
+    run(args.urls, args.repeats, args.keywords)
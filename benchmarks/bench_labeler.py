@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include the nlp stage directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/nlp')))
+
+from labeler import KeywordLabeler, NEUTRAL_LABEL
+
+WORDS = ['senate', 'vote', 'bill', 'policy', 'election', 'report', 'house', 'court', 'budget', 'state',
+         'news', 'live', 'update', 'weather', 'sports', 'market']
+KEYWORDS = ['trump', 'republican', 'conservative', 'gop', 'democrat', 'liberal', 'biden', 'newsom', 'climate']
+
+def make_titles(rows, seed=42):
+    """Build synthetic titles of six words where roughly a third mention a lexicon keyword."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array(WORDS + KEYWORDS)
+    # Keywords are drawn with low probability so most titles stay neutral, as in real history
+    p = np.array([1.0] * len(WORDS) + [0.1] * len(KEYWORDS))
+    words = vocab[rng.choice(len(vocab), size=(rows, 6), p=p / p.sum())]
+    titles = words[:, 0]
+    for i in range(1, words.shape[1]):
+        titles = np.char.add(np.char.add(titles, ' '), words[:, i])
+    return pd.Series(np.char.title(titles))
+
+def assign_label(title, url):
+    """The original per-row labeling rule from data/generate_labels.py."""
+    title = title.lower()
+    if any(keyword in title for keyword in ["trump", "republican", "conservative", "gop"]):
+        return 1
+    elif any(keyword in title for keyword in ["democrat", "liberal", "biden", "newsom", "climate"]):
+        return 0
+    else:
+        return 0
+
+def run(rows, sample, chunksize):
+    """Time the per-row apply on a sample and the vectorized labeler on every title, chunk by chunk."""
+    labeler = KeywordLabeler()
+
+    baseline = make_titles(sample)
+    start = time.perf_counter()
+    expected = baseline.apply(lambda x: assign_label(x, "")).to_numpy()
+    apply_time = time.perf_counter() - start
+
+    # Titles are generated per chunk, as generate_labels streams them, so 10M rows fit in memory
+    vector_time = 0.0
+    for offset in range(0, rows, chunksize):
+        titles = make_titles(min(chunksize, rows - offset), seed=offset)
+        start = time.perf_counter()
+        labeler.label(titles)
+        vector_time += time.perf_counter() - start
+
+    # Both rules agree wherever a title does not mix leanings
+    labels = labeler.label(baseline)
+    unmixed = (labeler.score(baseline) > 0).sum(axis=1) < 2
+    agree = (labels[unmixed] == expected[unmixed]).mean()
+
+    neutral = KeywordLabeler(neutral_label=NEUTRAL_LABEL).label(baseline)
+    counts = pd.Series(neutral).value_counts().sort_index().to_dict()
+
+    print(f"     apply: {sample:>10} titles {apply_time:7.2f}s  {sample / apply_time:12.0f} titles/s")
+    print(f"vectorized: {rows:>10} titles {vector_time:7.2f}s  {rows / vector_time:12.0f} titles/s")
+    print(f"speedup: {(rows / vector_time) / (sample / apply_time):.1f}x")
+    print(f"agreement with apply on unmixed titles: {agree:.4f}")
+    print(f"label counts with a neutral class on the sample: {counts}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized keyword labeler against per-row apply.")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--sample', type=int, default=1_000_000, help="Titles labeled by the per-row baseline")
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.rows, min(args.sample, args.rows), args.chunksize)
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/models'))
+sys.path.insert(0, MODELS_DIR)
+
+WORDS = ['trump', 'biden', 'gop', 'climate', 'liberal', 'senate', 'economy', 'news', 'vote', 'policy']
+
+# Loads one model artifact in a fresh process after importing sklearn, reports load time,
+# then waits so memory can be sampled while all workers are alive
+WORKER = '''
+import json, os, pickle, sys, time
+sys.path.insert(0, {models_dir!r})
+from bundle import load_bundle
+start = time.perf_counter()
+if {kind!r} == 'pickle':
+    with open({model_path!r}, 'rb') as f:
+        model = pickle.load(f)
+else:
+    model, _ = load_bundle({bundle_dir!r})
+elapsed = time.perf_counter() - start
+model.predict(['trump gop senate vote', 'biden climate liberal policy'])
+print(json.dumps({{'load_seconds': elapsed}}), flush=True)
+sys.stdin.readline()
+'''
+
+def make_model(rows, n_features, seed=42):
+    """Fit a train_streaming-style pipeline on synthetic text."""
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+    rng = random.Random(seed)
+    text = [' '.join(rng.choices(WORDS, k=6)) + f' token{rng.randint(0, n_features)}' for _ in range(rows)]
+    labels = [int('trump' in t or 'gop' in t) for t in text]
+    pipeline = Pipeline([
+        ('hash', HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)),
+        ('tfidf', TfidfTransformer()),
+        ('clf', SGDClassifier(loss='log_loss', random_state=seed)),
+    ])
+    return pipeline.fit(text, labels)
+
+def memory_kb(pid):
+    """Read resident and proportional set size of a process from /proc."""
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                usage[key.lower()] = int(value.split()[0])
+    return usage
+
+def measure(kind, model_path, bundle_dir, workers):
+    """Start workers loading the same artifact concurrently and sample their load time and memory."""
+    code = WORKER.format(models_dir=MODELS_DIR, kind=kind, model_path=model_path, bundle_dir=bundle_dir)
+    procs = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    results = []
+    for proc in procs:
+        result = json.loads(proc.stdout.readline())
+        result.update(memory_kb(proc.pid))
+        results.append(result)
+    for proc in procs:
+        proc.communicate('\n')
+    return results
+
+def check_round_trip(model, bundle_dir):
+    """Assert the reloaded bundle predicts the same probabilities as the model it was saved from."""
+    from bundle import load_bundle
+    loaded, _ = load_bundle(bundle_dir)
+    text = [' '.join(WORDS[i:i + 4]) for i in range(len(WORDS))]
+    assert np.allclose(loaded.predict_proba(text), model.predict_proba(text)), "bundle predict_proba mismatch"
+
+def run(rows, n_features, workers):
+    """Compare pickle loading against the memory-mapped bundle across concurrent workers."""
+    from bundle import save_bundle
+    model = make_model(rows, n_features)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        with open(model_path, 'wb') as f:
+            pickle.dump(model, f)
+        bundle_dir = os.path.join(tmp, 'bundle')
+        save_bundle(model, bundle_dir)
+        check_round_trip(model, bundle_dir)
+        for kind in ['pickle', 'bundle']:
+            results = measure(kind, model_path, bundle_dir, workers)
+            load_ms = np.median([r['load_seconds'] for r in results]) * 1000
+            rss = np.mean([r['rss'] for r in results]) / 1024
+            pss = sum(r['pss'] for r in results) / 1024
+            print(f"{kind:>6}: load {load_ms:8.1f} ms  rss/worker {rss:7.1f} MB  total pss ({workers} workers) {pss:7.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pickle vs memory-mapped bundle model loading.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--n-features', type=int, default=2**22)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    run(args.rows, args.n_features, args.workers)
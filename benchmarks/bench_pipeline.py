@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Adjust sys.path to include src and every stage directory the suite drives
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for stage_dir in ('src', 'src/scrape', 'src/nlp', 'src/models', 'src/serve'):
+    sys.path.append(os.path.join(ROOT, stage_dir))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_profiles import SCALES, make_profiles, resolve_visits
+
+# Stages recorded through utils.metrics, in pipeline order
+STAGES = ['extract_chromium_history', 'extract_firefox_history', 'preprocess_history', 'clean_text',
+          'dedup_history', 'generate_labels', 'vectorize_text', 'train_classifier', 'score_batch']
+# Relative change beyond which a stage counts as a regression
+DEFAULT_TOLERANCE = 0.2
+# Slowdowns smaller than this many seconds are timer noise on small scales, not regressions
+MIN_SLOWDOWN_SECONDS = 0.05
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000)
+
+def score(scorer, titles, urls, requests=200, batch_rows=10_000):
+    """Measure single-request latency percentiles and batch throughput of the saved model."""
+    from utils.metrics import stage_timer
+    latencies = []
+    for i in range(min(requests, len(titles))):
+        start = time.perf_counter()
+        scorer.predict_leaning(titles[i], urls[i])
+        latencies.append(time.perf_counter() - start)
+    with stage_timer('score_batch', rows=min(batch_rows, len(titles))):
+        scorer.predict_leaning(titles[:batch_rows], urls[:batch_rows])
+    return {'requests': len(latencies), 'p50_ms': percentile_ms(latencies, 50),
+            'p95_ms': percentile_ms(latencies, 95), 'p99_ms': percentile_ms(latencies, 99)}
+
+def run_suite(visits, seed, work_dir):
+    """Generate fixtures, run every stage on them in work_dir and return the results dict."""
+    start = time.perf_counter()
+    chrome_path, firefox_path, digest = make_profiles(os.path.join(work_dir, 'fixtures'), visits, seed)
+    generate_seconds = time.perf_counter() - start
+
+    # Stages use relative data/, models/ and logs/ paths, so run them inside the work directory
+    os.chdir(work_dir)
+    metrics_file = os.path.join(work_dir, 'metrics.jsonl')
+    os.environ['METRICS_FILE'] = metrics_file
+    from chrome_history import extract_chromium_history
+    from firefox_history import extract_firefox_history
+    from preprocess import preprocess_history
+    from dedup import dedup_history
+    from labeler import generate_labels
+    from vectorizer import vectorize_text
+    from train_classifier import train_classifier
+    from scorer import LeaningScorer
+    from utils.metrics import load_metrics
+    from utils.table_io import read_table
+
+    raw = ['data/raw/user1_history.csv', 'data/raw/user2_history.csv']
+    cleaned = 'data/processed/cleaned_history.csv'
+    deduped = 'data/processed/deduped_history.csv'
+    features = 'data/processed/tfidf_features.npz'
+    vectorizer = 'models/tfidf_vectorizer.pkl'
+    bundle_dir = 'models/logistic_regression_bundle'
+    extract_chromium_history(chrome_path, raw[0], read_mode='direct')
+    extract_firefox_history(firefox_path, raw[1], read_mode='direct')
+    preprocess_history(raw, cleaned, cache_path=None)
+    dedup_history(cleaned, deduped)
+    generate_labels(deduped, 'data/labels.csv')
+    vectorize_text(deduped, features, vectorizer_path=vectorizer)
+    _, accuracy = train_classifier(features, 'data/labels.csv', 'models/logistic_regression.pkl',
+                                   vectorizer_path=vectorizer, bundle_dir=bundle_dir)
+    history = read_table(raw[0], columns=['title', 'url']).fillna('')
+    scorer = LeaningScorer(vectorizer_path=vectorizer, bundle_dir=bundle_dir)
+    latency = score(scorer, history['title'].tolist(), history['url'].tolist())
+
+    stages = {}
+    for record in load_metrics(metrics_file):
+        if record['stage'] in STAGES:
+            stages[record['stage']] = {key: record.get(key) for key in
+                                       ('seconds', 'cpu_seconds', 'rows', 'rows_per_second', 'peak_rss_mb',
+                                        'concurrent_stages')}
+    return {
+        'suite': 'pipeline',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'visits': visits,
+        'seed': seed,
+        'fixture_digest': digest,
+        'generate_seconds': generate_seconds,
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'accuracy': accuracy,
+        'stages': {stage: stages[stage] for stage in STAGES if stage in stages},
+        'latency': latency,
+    }
+
+def compare(results, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    """Print each stage against the baseline and return the stages slower than tolerance allows.
+
+    Peak RSS is process-wide; a peak sampled while other stages ran is marked * as shared.
+    """
+    baseline = baseline or {'fixture_digest': results['fixture_digest'], 'stages': {}}
+    if baseline['fixture_digest'] != results['fixture_digest']:
+        print("warning: fixtures differ from the baseline's, so the comparison is not like for like")
+    print(f"{'stage':<26} {'seconds':>9} {'baseline':>9} {'change':>8} {'rows/s':>12} {'peak MiB':>9}")
+    regressions = []
+    rows = [(stage, values['seconds'], baseline['stages'].get(stage, {}).get('seconds'),
+             values['rows_per_second'], values['peak_rss_mb'], bool(values.get('concurrent_stages')))
+            for stage, values in results['stages'].items()]
+    rows.append(('latency p99 (ms)', results['latency']['p99_ms'], baseline.get('latency', {}).get('p99_ms'),
+                 None, None, False))
+    for stage, seconds, base, rate, peak, shared in rows:
+        peak = f"{peak:.0f}{'*' if shared else ''}" if peak is not None else '-'
+        change = seconds / base - 1 if base else None
+        if change is not None and change > tolerance and (stage.startswith('latency') or
+                                                          seconds - base > MIN_SLOWDOWN_SECONDS):
+            regressions.append(stage)
+        print(f"{stage:<26} {seconds:>9.3f} {f'{base:.3f}' if base else '-':>9} "
+              f"{f'{change:+.0%}' if change is not None else '-':>8} "
+              f"{f'{rate:.0f}' if rate is not None else '-':>12} {peak:>9}"
+              + ('  REGRESSION' if stage in regressions else ''))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every pipeline stage on synthetic browser profiles.")
+    parser.add_argument('--scale', default='small', help=f"One of {', '.join(SCALES)} or a visit count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', help="Keep fixtures and outputs here instead of a temporary directory")
+    parser.add_argument('--output', help="Results JSON (default: benchmarks/results/pipeline-<visits>.json)")
+    parser.add_argument('--baseline', help="Baseline JSON (default: benchmarks/baselines/pipeline-<visits>.json, "
+                        "committed for the default scale and seed)")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    visits = resolve_visits(args.scale)
+    output = os.path.abspath(args.output or os.path.join(ROOT, 'benchmarks', 'results', f'pipeline-{visits}.json'))
+    baseline_path = os.path.abspath(args.baseline or
+                                    os.path.join(ROOT, 'benchmarks', 'baselines', f'pipeline-{visits}.json'))
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_suite(visits, args.seed, os.path.abspath(args.work_dir))
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_suite(visits, args.seed, work_dir)
+            os.chdir(ROOT)
+
+    for path in [output] + ([baseline_path] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(f"Wrote results to {output}")
+
+    regressions = []
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    else:
+        compare(results)
+        print(f"No baseline compared{'; saved ' + baseline_path if args.save_baseline else ''}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+# Adjust sys.path to include the nlp stage directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/nlp')))
+
+from preprocess import clean_text, clean_columns, open_cache
+
+WORDS = ['trump', 'biden', 'election', 'senate', 'climate', 'policy', 'votes', 'running',
+         'republicans', 'democrats', 'economy', 'the', 'and', 'of', 'news', 'report',
+         # Non-ASCII words check that the vectorized regexes match clean_text beyond ASCII
+         'café', 'naïve', 'résumé', 'zürich', 'élection', 'señado', '–', '２０２４']
+DOMAINS = ['cnn.com', 'foxnews.com', 'nytimes.com', 'reddit.com', 'youtube.com']
+
+def make_history(rows, seed=42):
+    """Build a synthetic history frame with title and url columns."""
+    rng = random.Random(seed)
+    titles, urls = [], []
+    for i in range(rows):
+        words = rng.choices(WORDS, k=rng.randint(3, 10))
+        titles.append(' '.join(words).title() + f" - {rng.choice(DOMAINS)} {i % 100}")
+        urls.append(f"https://www.{rng.choice(DOMAINS)}/{'-'.join(words)}?id={i}")
+    return pd.DataFrame({'title': titles, 'url': urls})
+
+def run(rows, batch_size, n_process):
+    """Time the per-row apply path against the batched nlp.pipe path and check equality."""
+    df = make_history(rows)
+
+    start = time.perf_counter()
+    apply_title = df['title'].apply(clean_text)
+    apply_url = df['url'].apply(clean_text)
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned = clean_columns(df, ('title', 'url'), batch_size, n_process)
+    pipe_time = time.perf_counter() - start
+
+    assert cleaned['title'].equals(apply_title), "cleaned_title mismatch"
+    assert cleaned['url'].equals(apply_url), "cleaned_url mismatch"
+
+    timings = [('apply', apply_time), ('pipe', pipe_time)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ['cold', 'warm']:
+            cache = open_cache(os.path.join(tmp, 'clean_text.sqlite'))
+            start = time.perf_counter()
+            cached = clean_columns(df, ('title', 'url'), batch_size, n_process, cache)
+            timings.append((name, time.perf_counter() - start))
+            assert cached['title'].equals(apply_title), "cached cleaned_title mismatch"
+            print(f"{name} cache stats: {cache.stats()}")
+            cache.close()
+
+    for name, elapsed in timings:
+        print(f"{name:>6}: {elapsed:8.2f}s  {rows / elapsed:10.0f} rows/s")
+    print(f"speedup: {apply_time / pipe_time:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched text cleaning against the apply path.")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--n-process', type=int, default=1)
+    args = parser.parse_args()
+    run(args.rows, args.batch_size, args.n_process)
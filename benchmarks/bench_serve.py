@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Adjust sys.path to include the serve stage directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/serve')))
+
+TITLES = ['Trump rally draws GOP crowd', 'Biden signs climate bill', 'Senate votes on budget',
+          'Newsom speaks on liberal agenda', 'Conservative group sues state', 'Local weather report']
+URLS = ['https://www.foxnews.com/politics/rally', 'https://www.nytimes.com/climate/bill',
+        'https://www.cnn.com/politics/senate', 'https://www.reddit.com/r/news']
+
+def send(url, batch_size, rng):
+    """Send one POST /predict request and return its latency in seconds."""
+    payload = json.dumps({
+        'titles': [rng.choice(TITLES) for _ in range(batch_size)],
+        'urls': [rng.choice(URLS) for _ in range(batch_size)],
+    }).encode('utf-8')
+    request = urllib.request.Request(url, data=payload, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+def run(url, n_requests, concurrency, batch_size, seed=42):
+    """Fire n_requests from concurrency client threads and report latency percentiles and throughput."""
+    rngs = [random.Random(seed + i) for i in range(n_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda rng: send(url, batch_size, rng), rngs))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    print(f"requests: {n_requests}  concurrency: {concurrency}  batch size: {batch_size}")
+    print(f"p50: {np.percentile(latencies, 50):.2f} ms  p99: {np.percentile(latencies, 99):.2f} ms")
+    print(f"throughput: {n_requests / elapsed:.0f} requests/s  {n_requests * batch_size / elapsed:.0f} rows/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the local political-leaning scoring server.")
+    parser.add_argument('--url', default='http://127.0.0.1:8000/predict')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--start-server', action='store_true', help="Start the server in-process on a free port")
+    parser.add_argument('--model-path', default='models/logistic_regression.pkl')
+    parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl')
+    parser.add_argument('--bundle-dir')
+    args = parser.parse_args()
+    url = args.url
+    if args.start_server:
+        from server import serve
+        server = serve(args.model_path, args.vectorizer_path, port=0, bundle_dir=args.bundle_dir)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/predict"
+    run(url, args.requests, args.concurrency, args.batch_size)
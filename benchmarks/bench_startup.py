@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Adjust sys.path to include src so the command table comes from the CLI itself
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from cli import COMMANDS
+
+# Extra cold starts measured besides `cli.py <command> --help`
+PROBES = {
+    'import clean_text': ['-c', "import sys; sys.path[:0] = ['src', 'src/nlp']; from preprocess import clean_text"],
+    'import LeaningScorer': ['-c', "import sys; sys.path[:0] = ['src', 'src/serve']; from scorer import LeaningScorer"],
+}
+
+def parse_importtime(stderr):
+    """Return {top-level module: cumulative seconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that pulled them in
+        if not name[1:].startswith(' '):
+            modules[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+def cold_start(args, repeats=3):
+    """Run python -X importtime with args in a fresh interpreter; keep the fastest of repeats."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT, capture_output=True,
+                                text=True)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        modules = parse_importtime(result.stderr)
+        if best is None or wall < best['wall_seconds']:
+            heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:3]
+            best = {'wall_seconds': wall, 'import_seconds': sum(modules.values()),
+                    'heaviest': {name: seconds for name, seconds in heaviest}}
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start time of each CLI subcommand with -X importtime.")
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS) + list(PROBES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'command':<22} {'wall s':>7} {'import s':>9}  heaviest imports")
+    for command in args.commands:
+        argv = PROBES[command] if command in PROBES else ['src/cli.py', command, '--help']
+        results[command] = cold_start(argv, args.repeats)
+        heaviest = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in results[command]['heaviest'].items())
+        print(f"{command:<22} {results[command]['wall_seconds']:>7.2f} {results[command]['import_seconds']:>9.2f}"
+              f"  {heaviest}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include the src directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from utils.table_io import read_table, write_table
+
+WORDS = ['trump', 'biden', 'election', 'senate', 'climate', 'policy', 'vote', 'economy', 'news', 'report']
+DOMAINS = [f"news{i}.example.com" for i in range(200)]
+
+def make_history(rows, seed=42):
+    """Build a synthetic raw history frame with repeated URLs and datetime columns."""
+    rng = random.Random(seed)
+    n_urls = max(rows // 5, 1)
+    urls = [f"https://{rng.choice(DOMAINS)}/politics/article-{i}" for i in range(n_urls)]
+    titles = [' '.join(rng.choices(WORDS, k=8)).title() for _ in range(n_urls)]
+    picks = np.array([rng.randrange(n_urls) for _ in range(rows)])
+    last = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(rows) * 1_000_003, unit='us')
+    return pd.DataFrame({
+        'url': np.array(urls, dtype=object)[picks],
+        'title': np.array(titles, dtype=object)[picks],
+        'visit_count': np.ones(rows, dtype=np.int64),
+        'last_visit_time': last.astype('datetime64[us]'),
+    })
+
+def run(rows):
+    """Time the raw -> cleaned -> features I/O chain for each storage format."""
+    df = make_history(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in ['.csv', '.parquet', '.arrow']:
+            raw_path = os.path.join(tmp, f'raw{extension}')
+            cleaned_path = os.path.join(tmp, f'cleaned{extension}')
+            start = time.perf_counter()
+            write_table(df, raw_path)                        # scraper export
+            raw = read_table(raw_path)                       # preprocess_history input
+            raw['cleaned_title'] = raw['title'].str.lower()
+            raw['cleaned_url'] = raw['url']
+            write_table(raw, cleaned_path)                   # preprocess_history output
+            read_table(cleaned_path, columns=['cleaned_title', 'cleaned_url'])  # vectorize_text input
+            read_table(cleaned_path)                         # generate_labels input
+            elapsed = time.perf_counter() - start
+            size_mb = (os.path.getsize(raw_path) + os.path.getsize(cleaned_path)) / 2**20
+            dtype = read_table(raw_path)['last_visit_time'].dtype
+            print(f"{extension:>8}: {elapsed:7.2f}s  {size_mb:8.1f} MB on disk  last_visit_time dtype {dtype}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end table I/O for CSV, Parquet and Arrow IPC.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score
+
+# Adjust sys.path to include the nlp stage directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/nlp')))
+
+from preprocess import clean_text, clean_columns
+from url_features import featurize_urls
+from vectorizer import compose_text
+
+RIGHT_DOMAINS = ['www.foxnews.com', 'www.breitbart.com', 'www.dailywire.com', 'nypost.com']
+LEFT_DOMAINS = ['www.nytimes.com', 'www.msnbc.com', 'www.huffpost.com', 'www.theguardian.com']
+SECTIONS = ['politics', 'us-news', 'opinion', 'world', 'elections', 'economy']
+WORDS = ['senate', 'vote', 'bill', 'policy', 'election', 'report', 'house', 'court', 'budget', 'state']
+
+def make_history(rows, seed=42):
+    """Build synthetic visits whose leaning is carried mostly by the source and URL path."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        label = rng.randint(0, 1)
+        domain = rng.choice(RIGHT_DOMAINS if label else LEFT_DOMAINS)
+        words = rng.choices(WORDS, k=5)
+        slug = '-'.join(words + [rng.choice(['border', 'tax-cuts']) if label else rng.choice(['climate', 'healthcare'])])
+        url = f"https://{domain}/{rng.choice(SECTIONS)}/{slug}?utm_source=feed&id={i}"
+        records.append({'title': ' '.join(words).title(), 'url': url, 'label': label})
+    return pd.DataFrame(records)
+
+def accuracy(text, labels):
+    """Five-fold accuracy of the production TF-IDF + logistic regression setup."""
+    vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
+    X = vectorizer.fit_transform(text)
+    return cross_val_score(LogisticRegression(max_iter=1000), X, labels, cv=5).mean()
+
+def run(rows):
+    """Compare per-row clean_text on URLs with the url_features tokenizer on speed and accuracy."""
+    df = make_history(rows)
+
+    start = time.perf_counter()
+    spacy_urls = df['url'].apply(clean_text)
+    spacy_time = time.perf_counter() - start
+
+    # clean_text deletes whole http(s) URLs before SpaCy sees them, so also time it on the URL without
+    # its scheme: the cost of actually running URLs through SpaCy
+    start = time.perf_counter()
+    schemeless_urls = df['url'].str.replace(r'^https?://', '', regex=True).apply(clean_text)
+    schemeless_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = featurize_urls(df['url'])
+    fast_time = time.perf_counter() - start
+
+    titles = clean_columns(df, ('title',))['title']
+    spacy_text = compose_text(pd.DataFrame({'cleaned_title': titles, 'cleaned_url': spacy_urls}))
+    schemeless_text = compose_text(pd.DataFrame({'cleaned_title': titles, 'cleaned_url': schemeless_urls}))
+    fast_text = compose_text(pd.DataFrame({'cleaned_title': titles, 'cleaned_url': fast['cleaned_url'],
+                                           'domain': fast['domain']}))
+
+    print(f"spacy urls: {spacy_time:7.2f}s  {rows / spacy_time:10.0f} urls/s  accuracy {accuracy(spacy_text, df['label']):.3f}")
+    print(f" no scheme: {schemeless_time:7.2f}s  {rows / schemeless_time:10.0f} urls/s  "
+          f"accuracy {accuracy(schemeless_text, df['label']):.3f}")
+    print(f" fast urls: {fast_time:7.2f}s  {rows / fast_time:10.0f} urls/s  accuracy {accuracy(fast_text, df['label']):.3f}")
+    print(f"speedup: {spacy_time / fast_time:.1f}x ({schemeless_time / fast_time:.1f}x without scheme)")
+    print(f"example: {df['url'].iloc[0]} -> {fast['cleaned_url'].iloc[0]!r} [{fast['domain'].iloc[0]}]")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SpaCy-free URL tokenizer against clean_text.")
+    parser.add_argument('--rows', type=int, default=50_000)
+    args = parser.parse_args()
+    run(args.rows)
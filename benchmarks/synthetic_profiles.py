@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+
+SCALES = {'small': 10_000, 'medium': 100_000, 'large': 1_000_000, 'xlarge': 10_000_000}
+
+# (domain, leaning) by popularity rank; general sites dominate real history, news is the long tail
+DOMAINS = [
+    ('www.google.com', None), ('www.youtube.com', None), ('www.reddit.com', None), ('en.wikipedia.org', None),
+    ('github.com', None), ('www.amazon.com', None), ('mail.google.com', None), ('stackoverflow.com', None),
+    ('www.cnn.com', 0), ('www.foxnews.com', 1), ('www.nytimes.com', 0), ('www.bbc.co.uk', None),
+    ('www.washingtonpost.com', 0), ('nypost.com', 1), ('www.theguardian.com', 0), ('www.breitbart.com', 1),
+    ('www.msnbc.com', 0), ('www.dailywire.com', 1), ('www.huffpost.com', 0), ('www.newsmax.com', 1),
+    ('apnews.com', None), ('www.reuters.com', None), ('www.politico.com', None), ('thehill.com', None),
+]
+NEUTRAL_WORDS = ['weather', 'recipe', 'review', 'best', 'how', 'to', 'guide', 'video', 'live', 'update', 'sports',
+                 'score', 'market', 'stocks', 'travel', 'music', 'python', 'error', 'install', 'price', 'deal',
+                 'report', 'week', 'new', 'top', 'world', 'local', 'health', 'science', 'tech']
+POLITICAL_WORDS = {
+    0: ['democrat', 'democrats', 'biden', 'liberal', 'climate', 'newsom', 'healthcare', 'abortion', 'rights'],
+    1: ['trump', 'republican', 'republicans', 'gop', 'conservative', 'border', 'tax', 'cuts', 'gun'],
+}
+SHARED_WORDS = ['election', 'senate', 'vote', 'votes', 'policy', 'bill', 'court', 'house', 'budget', 'debate',
+                'congress', 'campaign', 'poll', 'politics', 'news']
+SECTIONS = ['politics', 'us-news', 'opinion', 'world', 'elections', 'business', 'watch', 'wiki', 'r', 'search']
+WEBKIT_UNIX_OFFSET_US = 11_644_473_600 * 1_000_000
+START_US = 1_735_689_600 * 1_000_000  # 2025-01-01 in Unix microseconds
+SPAN_US = 180 * 86_400 * 1_000_000
+
+def resolve_visits(scale):
+    """Accept a scale name from SCALES or a visit count."""
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+def zipf_weights(n, exponent):
+    """Normalized 1/rank**exponent popularity weights."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def generate_history(visits, seed=42, visits_per_url=3.0):
+    """Generate URLs, titles and visit times as plain arrays, deterministically from seed.
+
+    Domains and URLs both follow Zipf-like popularity, so a few URLs get most visits.
+    News titles mix shared political vocabulary with the domain's leaning; other
+    domains get neutral titles. Returns (urls, titles, visit_url_index, visit_times_us).
+    """
+    rng = np.random.default_rng(seed)
+    n_urls = max(1, int(visits / visits_per_url))
+    domain_index = rng.choice(len(DOMAINS), size=n_urls, p=zipf_weights(len(DOMAINS), 1.0))
+    word_index = rng.integers(0, 1 << 30, size=(n_urls, 7))
+    title_length = rng.integers(3, 8, size=n_urls)
+    lean_draw = rng.random(n_urls)
+    section_index = rng.integers(0, len(SECTIONS), size=n_urls)
+    tracking = rng.random(n_urls) < 0.2
+
+    urls, titles = [], []
+    for i in range(n_urls):
+        domain, leaning = DOMAINS[domain_index[i]]
+        picks = word_index[i, :title_length[i]]
+        if leaning is None and domain_index[i] < 8:
+            vocab = NEUTRAL_WORDS
+        elif leaning is None:
+            vocab = SHARED_WORDS + NEUTRAL_WORDS
+        else:
+            # Most news titles from a partisan outlet use its side's vocabulary, some use the other side's
+            side = leaning if lean_draw[i] < 0.8 else 1 - leaning
+            vocab = POLITICAL_WORDS[side] + SHARED_WORDS
+        words = [vocab[w % len(vocab)] for w in picks]
+        slug = '-'.join(words)
+        url = f"https://{domain}/{SECTIONS[section_index[i]]}/{slug}-{i}"
+        if tracking[i]:
+            url += f"?utm_source=feed&utm_medium=social&id={i}"
+        urls.append(url)
+        titles.append(' '.join(words).capitalize() + f" | {domain.split('.')[-2].capitalize()}")
+
+    visit_url_index = rng.choice(n_urls, size=visits, p=zipf_weights(n_urls, 0.8))
+    visit_times_us = START_US + np.sort(rng.integers(0, SPAN_US, size=visits))
+    return urls, titles, visit_url_index, visit_times_us
+
+def history_digest(urls, titles, visit_url_index, visit_times_us):
+    """Content digest of generated history, to check that two runs used identical fixtures."""
+    digest = hashlib.sha256()
+    digest.update('\n'.join(urls).encode('utf-8'))
+    digest.update('\n'.join(titles).encode('utf-8'))
+    digest.update(np.ascontiguousarray(visit_url_index, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(visit_times_us, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+def _connect(path):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    return conn
+
+def write_chrome_profile(path, urls, titles, visit_url_index, visit_times_us, batch_size=500_000):
+    """Write a Chrome History database with the urls and visits tables the scraper reads."""
+    conn = _connect(path)
+    conn.executescript("""
+        CREATE TABLE urls (id INTEGER PRIMARY KEY AUTOINCREMENT, url LONGVARCHAR, title LONGVARCHAR,
+                           visit_count INTEGER DEFAULT 0 NOT NULL, typed_count INTEGER DEFAULT 0 NOT NULL,
+                           last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL);
+        CREATE TABLE visits (id INTEGER PRIMARY KEY AUTOINCREMENT, url INTEGER NOT NULL, visit_time INTEGER NOT NULL,
+                             from_visit INTEGER, transition INTEGER DEFAULT 0 NOT NULL);
+        CREATE INDEX visits_url_index ON visits (url);
+        CREATE INDEX visits_time_index ON visits (visit_time);
+    """)
+    webkit_times = visit_times_us + WEBKIT_UNIX_OFFSET_US
+    counts = np.bincount(visit_url_index, minlength=len(urls))
+    last = np.zeros(len(urls), dtype=np.int64)
+    np.maximum.at(last, visit_url_index, webkit_times)
+    conn.executemany("INSERT INTO urls (id, url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?, ?)",
+                     zip(range(1, len(urls) + 1), urls, titles, counts.tolist(), last.tolist()))
+    for start in range(0, len(visit_url_index), batch_size):
+        stop = start + batch_size
+        conn.executemany("INSERT INTO visits (url, visit_time) VALUES (?, ?)",
+                         zip((visit_url_index[start:stop] + 1).tolist(), webkit_times[start:stop].tolist()))
+    conn.commit()
+    conn.close()
+
+def write_firefox_profile(path, urls, titles, visit_url_index, visit_times_us):
+    """Write a Firefox places.sqlite with the moz_places and moz_historyvisits tables the scraper reads."""
+    conn = _connect(path)
+    conn.executescript("""
+        CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+                                 visit_count INTEGER DEFAULT 0, last_visit_date INTEGER);
+        CREATE TABLE moz_historyvisits (id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER,
+                                        visit_date INTEGER, visit_type INTEGER, session INTEGER);
+        CREATE INDEX moz_historyvisits_placedateindex ON moz_historyvisits (place_id, visit_date);
+        CREATE INDEX moz_historyvisits_dateindex ON moz_historyvisits (visit_date);
+    """)
+    counts = np.bincount(visit_url_index, minlength=len(urls))
+    last = np.zeros(len(urls), dtype=np.int64)
+    np.maximum.at(last, visit_url_index, visit_times_us)
+    # Only places that were visited get a row, as Firefox keeps no last_visit_date otherwise
+    rows = ((int(i) + 1, urls[i], titles[i], int(counts[i]), int(last[i])) for i in np.flatnonzero(counts))
+    conn.executemany("INSERT INTO moz_places VALUES (?, ?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO moz_historyvisits (place_id, visit_date, visit_type) VALUES (?, ?, 1)",
+                     zip((visit_url_index + 1).tolist(), visit_times_us.tolist()))
+    conn.commit()
+    conn.close()
+
+def make_profiles(out_dir, visits, seed=42):
+    """Write a Chrome History and a Firefox places.sqlite with visits each; return their paths and digest.
+
+    The two profiles use different seeds so they look like two users.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    chrome = generate_history(visits, seed)
+    firefox = generate_history(visits, seed + 1)
+    chrome_path = os.path.join(out_dir, 'History')
+    firefox_path = os.path.join(out_dir, 'places.sqlite')
+    write_chrome_profile(chrome_path, *chrome)
+    write_firefox_profile(firefox_path, *firefox)
+    digest = hashlib.sha256((history_digest(*chrome) + history_digest(*firefox)).encode('utf-8')).hexdigest()
+    return chrome_path, firefox_path, digest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Chrome and Firefox history databases.")
+    parser.add_argument('--scale', default='small', help=f"One of {', '.join(SCALES)} or a visit count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out-dir', default='benchmarks/fixtures')
+    args = parser.parse_args()
+    chrome_path, firefox_path, digest = make_profiles(args.out_dir, resolve_visits(args.scale), args.seed)
+    print(f"Wrote {chrome_path} and {firefox_path} (digest {digest[:12]})")
@@ -1,26 +1,16 @@
-import pandas as pd
 import os
+import sys
 
-# Load the history data
-cleaned_path = "data/processed/cleaned_history.csv"
-history_path = 'data/raw/user1_history.csv'
-history_path = cleaned_path if os.path.exists(cleaned_path) else raw_path
+# Adjust sys.path to include the nlp stage directory for the labeling module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'nlp')))
+from labeler import main
 
-df = pd.read_csv(history_path)
-
-# Keyword-based labeling function
-def assign_label(title, url):
-    title = title.lower()
-    if any(keyword in title for keyword in ["trump", "republican", "conservative", "gop"]):
-        return 1  # Republican-leaning
-    elif any(keyword in title for keyword in ["democrat", "liberal", "biden", "newsom", "climate"]):
-        return 0  # Democrat-leaning
-    else:
-        return 0  # Default to neutral/Democrat-leaning
-
-# Apply labeling
-df['label'] = df['cleaned_title'].fillna(df['title']).apply(lambda x: assign_label(x, ""))
-
-# Save to labels.csv
-labels_df = df[['label']]
-labels_df.to_csv("data/labels.csv", index=False)
\ No newline at end of file
+# Keyword labeling now lives in src/nlp/labeler.py; positional paths are kept for existing callers:
+#   python data/generate_labels.py [history_path] [labels_path] [--lexicon lexicon.json] [--neutral-label 2]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) > 0 and not args[0].startswith('-'):
+        args = ['--input', args[0]] + args[1:]
+        if len(args) > 2 and not args[2].startswith('-'):
+            args = args[:2] + ['--output', args[2]] + args[3:]
+    main(args)
@@ -21,7 +21,7 @@ def setup_logger(name, log_file='logs/scrape_history.log', level=logging.INFO):
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setLevel(level)
-        console_formatter = logging.FormFormatter('%(levelname)s: %(message)s')
+        console_formatter = logging.Formatter('%(levelname)s: %(message)s')
         console_handler.setFormatter(console_formatter)
 
         # Add handlers to logger
@@ -0,0 +1,49 @@
+import argparse
+import os
+import runpy
+import sys
+
+SRC_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Subcommand -> (script relative to src/, description). A script is only imported when its subcommand
+# runs, so `cli.py labels` never loads scikit-learn and `cli.py score --help` never loads SpaCy
+COMMANDS = {
+    'chrome': ('scrape/chrome_history.py', "Extract Chrome/Brave history"),
+    'firefox': ('scrape/firefox_history.py', "Extract Firefox history"),
+    'profiles': ('scrape/extract_profiles.py', "Extract every browser profile concurrently"),
+    'preprocess': ('nlp/preprocess.py', "Clean history titles and urls"),
+    'dedup': ('nlp/dedup.py', "Collapse near-duplicate history rows into weighted rows"),
+    'labels': ('nlp/labeler.py', "Label cleaned history with the keyword lexicon"),
+    'vectorize': ('nlp/vectorizer.py', "Fit TF-IDF features"),
+    'train': ('models/train_classifier.py', "Train the Logistic Regression classifier"),
+    'search': ('models/search.py', "Cross-validated hyperparameter search"),
+    'train-streaming': ('models/train_streaming.py', "Train the out-of-core SGD classifier"),
+    'score': ('serve/batch_scorer.py', "Score history files and summarize each user's leaning"),
+    'serve': ('serve/server.py', "Serve predictions over local HTTP"),
+    'pipeline': ('pipeline.py', "Run the whole pipeline, skipping up-to-date stages"),
+    'metrics': ('utils/metrics.py', "Summarize stage metrics"),
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='cli.py', description="Political leaning indicator command line.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f"  {name:<16} {description}"
+                                         for name, (_, description) in COMMANDS.items()))
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command', help="One of the commands below")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="Arguments for the command; try <command> --help")
+    return parser
+
+def run_command(command, args):
+    """Run a stage script as __main__ with args, the way `python src/<script> args` would."""
+    path = os.path.join(SRC_DIR, COMMANDS[command][0])
+    sys.argv = [path] + list(args)
+    sys.path.insert(0, os.path.dirname(path))
+    runpy.run_path(path, run_name='__main__')
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    run_command(args.command, args.args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+from utils.logger import setup_logger
+
+# Set up logging
+logger = setup_logger('model_bundle')
+
+BUNDLE_FORMAT_VERSION = 1
+TFIDF_PARAMS = ['lowercase', 'stop_words', 'token_pattern', 'ngram_range', 'max_df', 'min_df', 'max_features',
+                'binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf']
+HASHING_PARAMS = ['n_features', 'lowercase', 'stop_words', 'token_pattern', 'ngram_range', 'binary', 'norm',
+                  'alternate_sign']
+# Linear classifiers a bundle can rebuild from coef/intercept/classes, with the params that change how
+# they turn decision values into predictions (SGD's loss decides whether and how predict_proba works)
+CLASSIFIER_PARAMS = {'LogisticRegression': [], 'SGDClassifier': ['loss']}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _params(estimator, names):
+    params = estimator.get_params()
+    return {name: list(params[name]) if isinstance(params[name], tuple) else params[name] for name in names}
+
+def _split_pipeline(model):
+    """Return (vectorizer, idf, classifier) from a Pipeline saved by train_streaming."""
+    steps = dict(model.steps)
+    idf = steps['tfidf'].idf_ if 'tfidf' in steps else None
+    return steps['hash'], idf, steps['clf']
+
+def save_bundle(model, bundle_dir, vectorizer=None, metadata=None):
+    """Save a linear model and its vectorizer as raw NumPy arrays plus a JSON manifest.
+
+    model is either a fitted linear classifier (with vectorizer a fitted TfidfVectorizer)
+    or a Pipeline saved by train_streaming.
+    """
+    import sklearn
+    os.makedirs(bundle_dir, exist_ok=True)
+    arrays = {}
+    if vectorizer is None:
+        vectorizer, idf, classifier = _split_pipeline(model)
+        vectorizer_manifest = {'type': 'hashing', 'params': _params(vectorizer, HASHING_PARAMS),
+                               'use_idf': idf is not None}
+        if idf is not None:
+            arrays['idf'] = idf
+    else:
+        classifier = model
+        vectorizer_manifest = {'type': 'tfidf', 'params': _params(vectorizer, TFIDF_PARAMS)}
+        arrays['idf'] = vectorizer.idf_
+        with open(os.path.join(bundle_dir, 'vocabulary.json'), 'w') as f:
+            json.dump(vectorizer.get_feature_names_out().tolist(), f)
+
+    classifier_name = type(classifier).__name__
+    if classifier_name not in CLASSIFIER_PARAMS:
+        raise ValueError(f"Cannot bundle a {classifier_name}, expected one of {sorted(CLASSIFIER_PARAMS)}")
+    arrays['coef'] = classifier.coef_
+    arrays['intercept'] = classifier.intercept_
+    arrays['classes'] = classifier.classes_
+    files = {}
+    for name, array in arrays.items():
+        path = os.path.join(bundle_dir, f'{name}.npy')
+        np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        files[f'{name}.npy'] = _sha256(path)
+    if vectorizer_manifest['type'] == 'tfidf':
+        files['vocabulary.json'] = _sha256(os.path.join(bundle_dir, 'vocabulary.json'))
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+        'sklearn_version': sklearn.__version__,
+        'classifier': classifier_name,
+        'classifier_params': _params(classifier, CLASSIFIER_PARAMS[classifier_name]),
+        'vectorizer': vectorizer_manifest,
+        'files': files,
+        'metadata': metadata or {},
+    }
+    with open(os.path.join(bundle_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Saved model bundle {manifest['model_version']} to {bundle_dir}")
+    return manifest
+
+def load_bundle(bundle_dir, mmap=True, verify=False):
+    """Load a bundle without unpickling; arrays are memory-mapped so worker processes share pages.
+
+    Returns a fitted Pipeline that takes raw cleaned text, and the manifest. The classifier
+    is rebuilt as the class named in the manifest, so predict_proba matches the saved model.
+    """
+    from sklearn import linear_model
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+    with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {manifest['format_version']}")
+    if manifest['classifier'] not in CLASSIFIER_PARAMS:
+        raise ValueError(f"Unsupported bundle classifier {manifest['classifier']}")
+    if verify:
+        for name, checksum in manifest['files'].items():
+            if _sha256(os.path.join(bundle_dir, name)) != checksum:
+                raise ValueError(f"Checksum mismatch for {name} in {bundle_dir}")
+
+    mmap_mode = 'r' if mmap else None
+    def load(name):
+        return np.load(os.path.join(bundle_dir, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+
+    vectorizer_manifest = manifest['vectorizer']
+    params = {name: tuple(value) if isinstance(value, list) and name == 'ngram_range' else value
+              for name, value in vectorizer_manifest['params'].items()}
+    steps = []
+    if vectorizer_manifest['type'] == 'tfidf':
+        with open(os.path.join(bundle_dir, 'vocabulary.json')) as f:
+            vocabulary = json.load(f)
+        vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(vocabulary)}, **params)
+        vectorizer.idf_ = load('idf')
+        steps.append(('tfidf', vectorizer))
+    else:
+        steps.append(('hash', HashingVectorizer(**params)))
+        if vectorizer_manifest['use_idf']:
+            transformer = TfidfTransformer()
+            transformer.idf_ = load('idf')
+            steps.append(('tfidf', transformer))
+
+    classifier = getattr(linear_model, manifest['classifier'])(**manifest.get('classifier_params', {}))
+    classifier.coef_ = load('coef')
+    classifier.intercept_ = load('intercept')
+    classifier.classes_ = load('classes')
+    steps.append(('clf', classifier))
+    logger.info(f"Loaded model bundle {manifest['model_version']} from {bundle_dir}")
+    return Pipeline(steps), manifest
@@ -0,0 +1,276 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from itertools import product
+
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.logger import setup_logger
+from utils.table_io import read_table, table_columns
+
+# Adjust sys.path to include the nlp stage directory for the shared text composition
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nlp')))
+from vectorizer import compose_text
+
+# Set up logging
+logger = setup_logger('model_search')
+
+# Production settings; grid values override them
+BASE_VECTORIZER_PARAMS = {'max_features': 5000, 'stop_words': 'english'}
+BASE_CLASSIFIER_PARAMS = {'max_iter': 1000}
+DEFAULT_GRID = {
+    'vectorizer': {'max_features': [5000, 20000], 'ngram_range': [[1, 1], [1, 2]]},
+    'classifier': {'C': [0.1, 1.0, 10.0], 'solver': ['lbfgs', 'liblinear']},
+}
+
+def expand_grid(params):
+    """Expand {name: [values]} into a list of {name: value} combinations."""
+    names = sorted(params)
+    return [dict(zip(names, values)) for values in product(*(params[name] for name in names))]
+
+def load_grid(path):
+    """Load a {'vectorizer': {...}, 'classifier': {...}} grid from a JSON file."""
+    with open(path) as f:
+        grid = json.load(f)
+    return {'vectorizer': grid.get('vectorizer', {}), 'classifier': grid.get('classifier', {})}
+
+def make_vectorizer(params):
+    """Build the production TF-IDF vectorizer with grid overrides; JSON lists become tuples."""
+    params = {name: tuple(value) if isinstance(value, list) else value for name, value in params.items()}
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(**{**BASE_VECTORIZER_PARAMS, **params})
+
+def make_classifier(params):
+    """Build the production LogisticRegression with grid overrides."""
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(**{**BASE_CLASSIFIER_PARAMS, **params})
+
+def data_fingerprint(*paths):
+    """Identify input files by path, size and modification time for cache keys."""
+    return [[os.path.abspath(path), os.path.getsize(path), os.stat(path).st_mtime_ns] for path in paths]
+
+def fold_cache_path(cache_dir, fingerprint, vectorizer_params, n_splits, fold, random_state):
+    """Return the cache file for one vectorizer setting fitted on one training fold."""
+    key = json.dumps([fingerprint, vectorizer_params, n_splits, fold, random_state], sort_keys=True)
+    return os.path.join(cache_dir, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.npz")
+
+def fold_features(text, train_idx, test_idx, vectorizer_params, cache_path=None):
+    """Fit TF-IDF on a training fold and transform both sides, reusing a cached result when present.
+
+    Returns (X_train, X_test, fit_time, cached); fit_time is the original fit time even on a cache hit.
+    """
+    from scipy import sparse
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cached:
+            X = sparse.csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                  shape=tuple(cached['shape']))
+            n_train = int(cached['n_train'])
+            fit_time = float(cached['fit_time'])
+        return X[:n_train], X[n_train:], fit_time, True
+    start = time.perf_counter()
+    vectorizer = make_vectorizer(vectorizer_params)
+    X_train = vectorizer.fit_transform(text[train_idx])
+    X_test = vectorizer.transform(text[test_idx])
+    fit_time = time.perf_counter() - start
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        X = sparse.vstack([X_train, X_test]).tocsr()
+        # Write under a temporary name so a concurrent or interrupted job never sees a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, data=X.data, indices=X.indices, indptr=X.indptr, shape=np.array(X.shape),
+                 n_train=X_train.shape[0], fit_time=fit_time)
+        os.replace(tmp_path, cache_path)
+    return X_train, X_test, fit_time, False
+
+def evaluate_fold(text, y, train_idx, test_idx, fold, vectorizer_params, classifier_grid, cache_path=None,
+                  weights=None):
+    """Score every classifier setting on one fold with a single TF-IDF fit shared between them.
+
+    weights, when given, are per-row sample weights used for fitting and for accuracy.
+    """
+    from sklearn.metrics import accuracy_score
+    X_train, X_test, vectorizer_time, cached = fold_features(text, train_idx, test_idx, vectorizer_params,
+                                                             cache_path)
+    w_train = weights[train_idx] if weights is not None else None
+    w_test = weights[test_idx] if weights is not None else None
+    results = []
+    for classifier_params in classifier_grid:
+        start = time.perf_counter()
+        model = make_classifier(classifier_params)
+        model.fit(X_train, y[train_idx], sample_weight=w_train)
+        fit_time = time.perf_counter() - start
+        accuracy = accuracy_score(y[test_idx], model.predict(X_test), sample_weight=w_test)
+        results.append({'vectorizer': vectorizer_params, 'classifier': classifier_params, 'fold': fold,
+                        'accuracy': accuracy, 'fit_time': fit_time, 'vectorizer_time': vectorizer_time,
+                        'vectorizer_cached': cached})
+    return results
+
+def summarize(fold_results):
+    """Aggregate per-fold results into one entry per configuration, best first."""
+    configs = {}
+    for result in fold_results:
+        key = json.dumps([result['vectorizer'], result['classifier']], sort_keys=True)
+        configs.setdefault(key, []).append(result)
+    summary = []
+    for results in configs.values():
+        scores = [result['accuracy'] for result in results]
+        summary.append({
+            'vectorizer': results[0]['vectorizer'],
+            'classifier': results[0]['classifier'],
+            'mean_accuracy': float(np.mean(scores)),
+            'std_accuracy': float(np.std(scores)),
+            'fold_accuracy': scores,
+            'mean_fit_time': float(np.mean([result['fit_time'] for result in results])),
+            'mean_vectorizer_time': float(np.mean([result['vectorizer_time'] for result in results])),
+            'cached_folds': sum(result['vectorizer_cached'] for result in results),
+        })
+    summary.sort(key=lambda entry: (-entry['mean_accuracy'], entry['mean_fit_time']))
+    for rank, entry in enumerate(summary, 1):
+        entry['rank'] = rank
+    return summary
+
+def save_model(model, vectorizer, model_path, vectorizer_path, bundle_dir, metadata):
+    """Pickle the model and vectorizer like train_classifier does, and save a bundle when bundle_dir is set."""
+    from bundle import save_bundle
+    for path, obj in [(model_path, model), (vectorizer_path, vectorizer)]:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(obj, f)
+    logger.info(f"Saved model to {model_path} and vectorizer to {vectorizer_path}")
+    if bundle_dir:
+        save_bundle(model, bundle_dir, vectorizer, metadata=metadata)
+
+def search_hyperparameters(history_path='data/processed/cleaned_history.csv', labels_path='data/labels.csv',
+                           grid=None, n_splits=5, n_jobs=-1, random_state=42,
+                           cache_dir='data/cache/search_folds', report_path='models/search_report.json',
+                           output_dir='models/search', promote=False,
+                           model_path='models/logistic_regression.pkl',
+                           vectorizer_path='models/tfidf_vectorizer.pkl',
+                           bundle_dir='models/logistic_regression_bundle'):
+    """Run stratified k-fold CV over a vectorizer x classifier grid and refit the best setting.
+
+    Each (vectorizer setting, fold) is one parallel job: TF-IDF is fitted once per job and
+    cached under cache_dir, so classifier-only settings never refit it, and reruns on the
+    same input reuse the cached folds. The ranked results, per-config timings and the
+    best setting are written to report_path; the best model is refit on all rows and
+    saved with its vectorizer and bundle under output_dir. Only promote=True also writes
+    it over the production model_path, vectorizer_path and bundle_dir that
+    train_classifier and the pipeline's train stage produce; a later train stage run
+    replaces a promoted model, as the pipeline does not track it. A weight column from
+    dedup_history in the history is used as sample_weight throughout.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+    try:
+        if not os.path.exists(history_path):
+            raise FileNotFoundError(f"Input file {history_path} not found")
+        grid = grid or DEFAULT_GRID
+        available = table_columns(history_path)
+        columns = [c for c in ['cleaned_title', 'cleaned_url', 'domain', 'weight'] if c in available]
+        history_df = read_table(history_path, columns=columns)
+        text = compose_text(history_df).to_numpy(dtype=object)
+        weights = history_df['weight'].fillna(1).to_numpy(dtype=float) if 'weight' in history_df.columns else None
+        labels_df = read_table(labels_path)
+        if 'label' not in labels_df.columns:
+            raise ValueError("Labels file must contain a 'label' column")
+        y = labels_df['label'].to_numpy()
+        if len(y) != len(text):
+            raise ValueError("Mismatch between number of samples in history and labels")
+
+        vectorizer_grid = expand_grid(grid.get('vectorizer', {}))
+        classifier_grid = expand_grid(grid.get('classifier', {}))
+        if len(np.unique(y)) > 2:
+            # liblinear only fits binary LogisticRegression, e.g. once the labeler adds a neutral class
+            classifier_grid = [params for params in classifier_grid if params.get('solver') != 'liblinear']
+            if not classifier_grid:
+                raise ValueError("Every classifier setting uses liblinear, which cannot fit more than 2 classes")
+            logger.info(f"Dropped liblinear settings for {len(np.unique(y))} classes")
+        folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(text, y))
+        fingerprint = data_fingerprint(history_path, labels_path)
+        logger.info(f"Searching {len(vectorizer_grid)} vectorizer x {len(classifier_grid)} classifier settings "
+                    f"with {n_splits}-fold CV on {len(y)} samples")
+
+        start = time.perf_counter()
+        jobs = []
+        for vectorizer_params, (fold, (train_idx, test_idx)) in product(vectorizer_grid, enumerate(folds)):
+            cache_path = cache_dir and fold_cache_path(cache_dir, fingerprint, vectorizer_params, n_splits, fold,
+                                                       random_state)
+            jobs.append(delayed(evaluate_fold)(text, y, train_idx, test_idx, fold, vectorizer_params,
+                                               classifier_grid, cache_path, weights))
+        fold_results = [result for results in Parallel(n_jobs=n_jobs)(jobs) for result in results]
+        search_time = time.perf_counter() - start
+        summary = summarize(fold_results)
+        best = summary[0]
+        logger.info(f"Search finished in {search_time:.1f}s; best accuracy {best['mean_accuracy']:.3f} with "
+                    f"vectorizer {best['vectorizer']} and classifier {best['classifier']}")
+
+        # Refit the best setting on every row; the production model is only replaced on request
+        vectorizer = make_vectorizer(best['vectorizer'])
+        X = vectorizer.fit_transform(text)
+        model = make_classifier(best['classifier'])
+        model.fit(X, y, sample_weight=weights)
+        metadata = {'accuracy': best['mean_accuracy'], 'n_samples': len(y), 'search': report_path}
+        outputs = {'model_path': os.path.join(output_dir, os.path.basename(model_path)),
+                   'vectorizer_path': os.path.join(output_dir, os.path.basename(vectorizer_path)),
+                   'bundle_dir': os.path.join(output_dir, os.path.basename(os.path.normpath(bundle_dir)))
+                   if bundle_dir else None}
+        save_model(model, vectorizer, outputs['model_path'], outputs['vectorizer_path'], outputs['bundle_dir'],
+                   metadata)
+        if promote:
+            save_model(model, vectorizer, model_path, vectorizer_path, bundle_dir, metadata)
+            logger.info("Promoted the best model over the production model")
+
+        report = {
+            'history_path': history_path,
+            'labels_path': labels_path,
+            'n_samples': int(len(y)),
+            'n_splits': n_splits,
+            'random_state': random_state,
+            'grid': grid,
+            'search_time': search_time,
+            'best': best,
+            **outputs,
+            'promoted': {'model_path': model_path, 'vectorizer_path': vectorizer_path, 'bundle_dir': bundle_dir}
+            if promote else None,
+            'results': summary,
+        }
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved search report to {report_path}")
+
+        return model, vectorizer, report
+
+    except Exception as e:
+        logger.error(f"Hyperparameter search failed: {e}")
+        raise
+
+def main(argv=None):
+    """Command-line entry point for the hyperparameter search."""
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the TF-IDF classifier.")
+    parser.add_argument('--history-path', default='data/processed/cleaned_history.csv')
+    parser.add_argument('--labels-path', default='data/labels.csv')
+    parser.add_argument('--grid', help="JSON file shaped like DEFAULT_GRID")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel jobs; -1 uses every core")
+    parser.add_argument('--cache-dir', default='data/cache/search_folds', help="Empty string disables fold caching")
+    parser.add_argument('--report-path', default='models/search_report.json')
+    parser.add_argument('--output-dir', default='models/search', help="Where the best model and bundle are saved")
+    parser.add_argument('--promote', action='store_true',
+                        help="Also overwrite the production model, vectorizer and bundle with the best model")
+    parser.add_argument('--model-path', default='models/logistic_regression.pkl', help="Production model")
+    parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl', help="Production vectorizer")
+    parser.add_argument('--bundle-dir', default='models/logistic_regression_bundle', help="Production bundle")
+    args = parser.parse_args(argv)
+    grid = load_grid(args.grid) if args.grid else None
+    return search_hyperparameters(args.history_path, args.labels_path, grid, args.folds, args.n_jobs,
+                                  cache_dir=args.cache_dir or None, report_path=args.report_path,
+                                  output_dir=args.output_dir, promote=args.promote, model_path=args.model_path,
+                                  vectorizer_path=args.vectorizer_path, bundle_dir=args.bundle_dir)
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,85 @@
-import pandas as pd
+import argparse
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+import pandas as pd
 import os
-from utils.logger import setup_logger
 import pickle
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.logger import setup_logger
+from utils.table_io import read_table, table_columns
+from utils.metrics import annotate, count_rows, timed
+
+# Adjust sys.path to include the nlp stage directory for the per-row metadata written next to the features
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nlp')))
+from vectorizer import rows_path_for
 
 # Set up logging
 logger = setup_logger('model_train')
 
-def train_classifier(tfidf_path='data/processed/tfidf_features.pkl', labels_path='data/labels.csv', 
-                    model_path='models/logistic_regression.pkl'):
-    """Train a Logistic Regression classifier and save the model."""
+def load_features(tfidf_path, dense_pickle=False):
+    """Load TF-IDF features as a CSR matrix, or from a legacy dense DataFrame pickle."""
+    if dense_pickle:
+        return pd.read_pickle(tfidf_path).values
+    from scipy import sparse
+    return sparse.load_npz(tfidf_path).tocsr()
+
+def load_sample_weight(tfidf_path):
+    """Return the per-row weight that dedup_history adds, if the features were built from deduplicated rows."""
+    rows_path = rows_path_for(tfidf_path)
+    if not os.path.exists(rows_path) or 'weight' not in table_columns(rows_path):
+        return None
+    return read_table(rows_path, columns=['weight'])['weight'].fillna(1).to_numpy(dtype=float)
+
+@timed('train_classifier')
+def train_classifier(tfidf_path='data/processed/tfidf_features.npz', labels_path='data/labels.csv', 
+                    model_path='models/logistic_regression.pkl', dense_pickle=False,
+                    vectorizer_path='models/tfidf_vectorizer.pkl', bundle_dir='models/logistic_regression_bundle'):
+    """Train a Logistic Regression classifier and save the model.
+
+    When the fitted vectorizer from vectorize_text is available, the model is also
+    saved as an mmap-able bundle in bundle_dir. When the features carry a weight column
+    from dedup_history, it is used as sample_weight for fitting and for test accuracy.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
     try:
         # Load TF-IDF features
-        tfidf_df = pd.read_pickle(tfidf_path)
-        logger.info(f"Loaded TF-IDF features from {tfidf_path} with shape {tfidf_df.shape}")
+        X = load_features(tfidf_path, dense_pickle)
+        logger.info(f"Loaded TF-IDF features from {tfidf_path} with shape {X.shape}")
+        count_rows(X.shape[0])
 
         # Load labels
-        labels_df = pd.read_csv(labels_path)
+        labels_df = read_table(labels_path)
         if 'label' not in labels_df.columns:
             raise ValueError("Labels file must contain a 'label' column")
         y = labels_df['label']
-        if len(y) != tfidf_df.shape[0]:
+        if len(y) != X.shape[0]:
             raise ValueError("Mismatch between number of samples in TF-IDF and labels")
-        X = tfidf_df.values
+        weights = load_sample_weight(tfidf_path)
+        if weights is not None:
+            if len(weights) != X.shape[0]:
+                raise ValueError("Mismatch between number of samples in TF-IDF and weights")
+            logger.info(f"Weighting {X.shape[0]} deduplicated samples standing for {int(weights.sum())} rows")
+        else:
+            weights = np.ones(X.shape[0])
 
         # Split data into train and test sets
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        logger.info(f"Split data into train ({len(X_train)} samples) and test ({len(X_test)} samples)")
+        X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(X, y, weights, test_size=0.2,
+                                                                             random_state=42)
+        logger.info(f"Split data into train ({X_train.shape[0]} samples) and test ({X_test.shape[0]} samples)")
 
         # Train Logistic Regression
         model = LogisticRegression(max_iter=1000)
-        model.fit(X_train, y_train)
+        model.fit(X_train, y_train, sample_weight=w_train)
         logger.info("Model training completed")
 
         # Evaluate
         y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
+        accuracy = accuracy_score(y_test, y_pred, sample_weight=w_test)
         logger.info(f"Model accuracy on test set: {accuracy:.2f}")
+        annotate(accuracy=accuracy)
 
         # Save model
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
@@ -49,6 +87,13 @@ def train_classifier(tfidf_path='data/processed/tfidf_features.pkl', labels_path
             pickle.dump(model, f)
         logger.info(f"Saved model to {model_path}")
 
+        # Save the pickle-free bundle for inference
+        if bundle_dir and vectorizer_path and os.path.exists(vectorizer_path):
+            from bundle import save_bundle
+            with open(vectorizer_path, 'rb') as f:
+                vectorizer = pickle.load(f)
+            save_bundle(model, bundle_dir, vectorizer, metadata={'accuracy': accuracy, 'n_samples': X.shape[0]})
+
         return model, accuracy
 
     except Exception as e:
@@ -56,4 +101,18 @@ def train_classifier(tfidf_path='data/processed/tfidf_features.pkl', labels_path
         raise
 
 if __name__ == "__main__":
-    train_classifier()
\ No newline at end of file
+    # --search runs the cross-validated grid search in search.py; other arguments are passed through
+    if '--search' in sys.argv:
+        from search import main
+        main([arg for arg in sys.argv[1:] if arg != '--search'])
+    else:
+        parser = argparse.ArgumentParser(description="Train the Logistic Regression classifier on TF-IDF features.",
+                                         epilog="Pass --search to run the cross-validated grid search instead.")
+        parser.add_argument('--features', default='data/processed/tfidf_features.npz')
+        parser.add_argument('--labels', default='data/labels.csv')
+        parser.add_argument('--model-path', default='models/logistic_regression.pkl')
+        parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl')
+        parser.add_argument('--bundle-dir', default='models/logistic_regression_bundle')
+        args = parser.parse_args()
+        train_classifier(args.features, args.labels, args.model_path, vectorizer_path=args.vectorizer_path,
+                         bundle_dir=args.bundle_dir)
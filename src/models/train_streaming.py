@@ -0,0 +1,158 @@
+import argparse
+import os
+import pickle
+import sys
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+# Adjust sys.path to include src directory for the shared metrics module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.logger import setup_logger
+from utils.metrics import annotate, count_rows, timed
+
+# Adjust sys.path to include the nlp stage directory for the shared text composition
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nlp')))
+from vectorizer import compose_text
+
+# Set up logging
+logger = setup_logger('model_train')
+
+def iter_chunks(history_path, labels_path, chunksize):
+    """Yield aligned (text, label, weight) chunks from the cleaned history and labels CSVs.
+
+    weight is the column dedup_history adds, or all ones for history that was not deduplicated.
+    """
+    history_chunks = pd.read_csv(history_path,
+                                 usecols=lambda c: c in ('cleaned_title', 'cleaned_url', 'domain', 'weight'),
+                                 chunksize=chunksize)
+    label_chunks = pd.read_csv(labels_path, chunksize=chunksize)
+    for history_chunk, label_chunk in zip_longest(history_chunks, label_chunks):
+        if history_chunk is None or label_chunk is None or len(history_chunk) != len(label_chunk):
+            raise ValueError("Mismatch between number of samples in history and labels")
+        if 'label' not in label_chunk.columns:
+            raise ValueError("Labels file must contain a 'label' column")
+        text = compose_text(history_chunk)
+        if 'weight' in history_chunk.columns:
+            weights = history_chunk['weight'].fillna(1).to_numpy(dtype=float)
+        else:
+            weights = np.ones(len(history_chunk))
+        yield text, label_chunk['label'].to_numpy(), weights
+
+def split_mask(n_rows, test_size, rng):
+    """Draw a per-row test mask so the split is reproducible chunk by chunk."""
+    return rng.random(n_rows) < test_size
+
+def fit_idf(history_path, labels_path, vectorizer, chunksize):
+    """Count document frequencies over all chunks and return the smoothed IDF vector and the classes."""
+    doc_freq = np.zeros(vectorizer.n_features, dtype=np.int64)
+    n_docs = 0
+    classes = set()
+    for text, labels, _ in iter_chunks(history_path, labels_path, chunksize):
+        X = vectorizer.transform(text)
+        doc_freq += np.bincount(X.indices, minlength=vectorizer.n_features)
+        n_docs += X.shape[0]
+        classes.update(np.unique(labels).tolist())
+    idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+    return idf, sorted(classes)
+
+def collect_classes(labels_path, chunksize):
+    """Collect the label set with a cheap pass over the labels file only."""
+    classes = set()
+    for label_chunk in pd.read_csv(labels_path, chunksize=chunksize):
+        if 'label' not in label_chunk.columns:
+            raise ValueError("Labels file must contain a 'label' column")
+        classes.update(label_chunk['label'].unique().tolist())
+    return sorted(classes)
+
+@timed('train_streaming')
+def train_streaming(history_path='data/processed/cleaned_history.csv', labels_path='data/labels.csv',
+                    model_path='models/sgd_classifier.pkl', chunksize=100_000, n_features=2**20,
+                    use_idf=True, n_epochs=1, test_size=0.2, random_state=42,
+                    bundle_dir='models/sgd_classifier_bundle'):
+    """Train an SGD classifier out of core on hashed features and save the fitted pipeline.
+
+    Memory is bounded by chunksize and n_features, not by the size of the input files.
+    A weight column from dedup_history is used as sample_weight and to weight test accuracy.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from bundle import save_bundle
+    try:
+        if not os.path.exists(history_path):
+            raise FileNotFoundError(f"Input file {history_path} not found")
+        hasher = HashingVectorizer(n_features=n_features, stop_words='english', alternate_sign=False,
+                                   norm=None if use_idf else 'l2')
+        steps = [('hash', hasher)]
+        if use_idf:
+            idf, classes = fit_idf(history_path, labels_path, hasher, chunksize)
+            transformer = TfidfTransformer()
+            transformer.idf_ = idf
+            steps.append(('tfidf', transformer))
+            logger.info(f"Fitted IDF over {n_features} hashed features from {history_path}")
+        else:
+            classes = collect_classes(labels_path, chunksize)
+        logger.info(f"Streaming {history_path} and {labels_path} in chunks of {chunksize} rows")
+
+        model = SGDClassifier(loss='log_loss', random_state=random_state)
+        steps.append(('clf', model))
+        pipeline = Pipeline(steps)
+        features = Pipeline(steps[:-1])
+
+        n_train = n_test = 0
+        for epoch in range(n_epochs):
+            rng = np.random.default_rng(random_state)
+            for text, labels, weights in iter_chunks(history_path, labels_path, chunksize):
+                is_test = split_mask(len(labels), test_size, rng)
+                if epoch == 0:
+                    n_test += int(is_test.sum())
+                    n_train += int((~is_test).sum())
+                if (~is_test).any():
+                    X = features.transform(text[~is_test])
+                    model.partial_fit(X, labels[~is_test], classes=classes, sample_weight=weights[~is_test])
+        logger.info(f"Split data into train ({n_train} samples) and test ({n_test} samples)")
+        logger.info("Model training completed")
+
+        # Evaluate on the held-out rows, re-drawing the same split
+        correct = total = 0.0
+        rng = np.random.default_rng(random_state)
+        for text, labels, weights in iter_chunks(history_path, labels_path, chunksize):
+            is_test = split_mask(len(labels), test_size, rng)
+            if is_test.any():
+                y_pred = model.predict(features.transform(text[is_test]))
+                correct += float(weights[is_test][y_pred == labels[is_test]].sum())
+                total += float(weights[is_test].sum())
+        accuracy = correct / total if total else float('nan')
+        logger.info(f"Model accuracy on test set: {accuracy:.2f}")
+        count_rows(n_train + n_test)
+        annotate(accuracy=accuracy)
+
+        # Save model
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        with open(model_path, 'wb') as f:
+            pickle.dump(pipeline, f)
+        logger.info(f"Saved model to {model_path}")
+        if bundle_dir:
+            save_bundle(pipeline, bundle_dir, metadata={'accuracy': accuracy, 'n_samples': n_train + n_test})
+
+        return pipeline, accuracy
+
+    except Exception as e:
+        logger.error(f"Training failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train an out-of-core SGD classifier on hashed text features.")
+    parser.add_argument('--history-path', default='data/processed/cleaned_history.csv')
+    parser.add_argument('--labels-path', default='data/labels.csv')
+    parser.add_argument('--model-path', default='models/sgd_classifier.pkl')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--n-features', type=int, default=2**20)
+    parser.add_argument('--no-idf', action='store_true', help="Skip the IDF pass and use l2-normalized term counts")
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--bundle-dir', default='models/sgd_classifier_bundle')
+    args = parser.parse_args()
+    train_streaming(args.history_path, args.labels_path, args.model_path, args.chunksize, args.n_features,
+                    not args.no_idf, args.epochs, args.test_size, bundle_dir=args.bundle_dir)
@@ -0,0 +1,256 @@
+import argparse
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include src directory for the shared table readers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logger import setup_logger
+from utils.table_io import read_table, write_table
+from utils.metrics import annotate, count_rows, timed
+from url_features import TRACKING_KEYS, url_domain
+
+# Set up logging
+logger = setup_logger('nlp_dedup')
+
+# Query keys that only select a page of the same content
+PAGINATION_KEYS = {'page', 'pg', 'pagenum', 'page_num'}
+# Trailing /page/2 or /p/2 path segments of paginated articles and listings
+PAGE_SEGMENT = re.compile(r'/(?:page|p)/\d+/?$')
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+def band_multipliers(rows):
+    """Return rows odd multipliers that fold one LSH band of a signature into a single bucket key."""
+    return np.random.default_rng(0).integers(1, 1 << 62, size=rows, dtype=np.uint64) | np.uint64(1)
+
+def is_noise_key(key):
+    """Whether a query key only tracks the visit or selects a page, and so is dropped by normalize_url."""
+    key = key.lower()
+    return key.startswith('utm_') or key in TRACKING_KEYS or key in PAGINATION_KEYS
+
+def normalize_query(query):
+    """Drop tracking and pagination parameters from a query string and sort the rest."""
+    params = sorted(param for param in query.split('&') if param and not is_noise_key(param.split('=', 1)[0]))
+    return f"?{'&'.join(params)}" if params else ''
+
+def normalize_urls(urls):
+    """Canonical form of each URL for grouping visits to the same content, plus its domain.
+
+    The scheme, www., fragment, tracking and pagination parameters, a trailing /page/N
+    and trailing slashes are dropped, and the remaining parameters are sorted. Everything
+    but the query runs as vectorized string operations; each distinct query is parsed once.
+    """
+    # Each part is cut out with its own regex replace; these run vectorized, unlike split(expand=True)
+    text = urls.fillna('').astype(str).str.replace(r'^[A-Za-z][A-Za-z0-9+.-]*:(?://)?|#.*$', '', regex=True)
+    base = text.str.replace(r'\?.*$', '', regex=True)
+    query_text = text.str.replace(r'^[^?]*\??', '', regex=True)
+    # Host without userinfo, port or www., as urlsplit(...).hostname gives it
+    hostname = base.str.replace(r'/.*$', '', regex=True).str.lower().str.replace(r'^.*@|:\d*$|^www\.', '',
+                                                                                 regex=True)
+    path = base.str.replace(r'^[^/]*', '', regex=True).str.replace(PAGE_SEGMENT.pattern, '', regex=True)
+    path = path.str.rstrip('/')
+    queries = {query: normalize_query(query) for query in pd.unique(query_text) if query}
+    query = query_text.map(queries).fillna('')
+    domains = {name: url_domain(name) for name in pd.unique(hostname)}
+    return pd.DataFrame({
+        'normalized_url': hostname + path + query,
+        'domain': hostname.map(domains).fillna(''),
+    }, index=urls.index)
+
+def minhash_signatures(titles, num_perm=64, seed=42):
+    """Return a (len(titles), num_perm) uint32 MinHash signature of each title's set of words.
+
+    Each distinct word is hashed once with CRC32 and permuted with num_perm universal
+    hashes (a * x + b) mod (2**61 - 1); each column is the minimum over a title's words,
+    gathered for all titles at once with np.minimum.reduceat. Minima are kept to their low
+    32 bits, which halves memory and only adds a 2**-32 chance of a false agreement.
+    Titles without words get all-maximum rows and should be left out of LSH.
+    """
+    titles = list(titles)
+    # Filled one permutation at a time, so each permutation's minima are a contiguous row here
+    signatures = np.full((num_perm, len(titles)), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not titles:
+        return signatures.T
+    # One split of all titles joined by spaces is far faster than splitting each title; empty words from
+    # repeated spaces are dropped afterwards, and a repeated word cannot change a minimum
+    counts = np.fromiter((title.count(' ') + 1 for title in titles), dtype=np.int64, count=len(titles))
+    word_ids, vocabulary = pd.factorize(np.array(' '.join(titles).split(' '), dtype=object))
+    rows = np.repeat(np.arange(len(titles)), counts)
+    empty = np.flatnonzero(vocabulary == '')
+    if len(empty):
+        is_word = word_ids != empty[0]
+        rows, word_ids = rows[is_word], word_ids[is_word]
+    lengths = np.bincount(rows, minlength=len(titles))
+    word_hashes = np.array([zlib.crc32(word.encode('utf-8')) for word in vocabulary], dtype=np.uint64)
+
+    rng = np.random.default_rng(seed)
+    # a < 2**31 and hashes < 2**32 keep a * x + b below 2**64, so uint64 arithmetic never wraps
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    has_words = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[has_words]
+    if len(starts):
+        for i in range(num_perm):
+            permuted = ((a[i] * word_hashes + b[i]) % MERSENNE_PRIME).astype(np.uint32)
+            minima = np.minimum.reduceat(permuted[word_ids], starts)
+            if has_words.all():
+                signatures[i] = minima
+            else:
+                signatures[i, has_words] = minima
+    return signatures.T
+
+def choose_bands(num_perm, threshold):
+    """Pick the band count whose LSH threshold (1/bands)**(1/rows) is closest to threshold."""
+    candidates = [bands for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(candidates, key=lambda bands: abs((1 / bands) ** (bands / num_perm) - threshold))
+
+def near_duplicate_pairs(signatures, groups, threshold=0.8, bands=None):
+    """Find pairs of near-duplicate titles with LSH banding over their MinHash signatures.
+
+    Titles are bucketed by each band of their signature, within their group (the
+    domain), and every title is paired with the first title of its bucket. Pairs are
+    kept when their signatures agree on at least threshold of positions, the MinHash
+    estimate of their Jaccard similarity. Returns two index arrays (members, leaders).
+    """
+    n, num_perm = signatures.shape
+    bands = bands or choose_bands(num_perm, threshold)
+    rows = num_perm // bands
+    group_keys = groups.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    multipliers = band_multipliers(rows)
+    members, leaders = [], []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows]
+        keys = (block.astype(np.uint64) * multipliers).sum(axis=1) ^ group_keys
+        leader = first_of(keys)
+        candidates = np.flatnonzero((leader != np.arange(n)) & (groups[leader] == groups))
+        if len(candidates) == 0:
+            continue
+        agreement = (signatures[candidates] == signatures[leader[candidates]]).mean(axis=1)
+        keep = candidates[agreement >= threshold]
+        members.append(keep)
+        leaders.append(leader[keep])
+    if not members:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    # The same pair is usually found by several bands
+    pairs = pd.unique(np.concatenate(members) * n + np.concatenate(leaders))
+    return pairs // n, pairs % n
+
+def first_of(values):
+    """Map every row to the first row with an equal value, hashing instead of sorting."""
+    codes = pd.factorize(values)[0]
+    # factorize numbers values in order of first appearance, so each new running maximum is a first row
+    running = np.maximum.accumulate(codes)
+    first = np.flatnonzero(np.r_[True, running[1:] > running[:-1]])
+    return first[codes]
+
+def user_keys(users, values):
+    """Combine per-row user codes with values into one int64 key per row."""
+    codes, uniques = pd.factorize(values)
+    return users.astype(np.int64) * max(len(uniques), 1) + codes
+
+def duplicate_components(df, threshold=0.8, num_perm=64, seed=42):
+    """Assign each row a component id; rows in one component are duplicates of each other.
+
+    Rows are linked when their normalized URLs match, when their cleaned titles match
+    within a domain, or when their titles are near duplicates within a domain. With a
+    user_id column every key also includes the user, so a group never spans users and the
+    kept row's user_id stands for all of it. Returns (component ids, stats).
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    if 'url' not in df.columns or 'cleaned_title' not in df.columns:
+        raise ValueError("Input must contain 'url' and 'cleaned_title' columns")
+    n = len(df)
+    urls = normalize_urls(df['url'])
+    domains = df['domain'].fillna('').astype(str) if 'domain' in df.columns else urls['domain']
+    titles = df['cleaned_title'].fillna('').astype(str).str.strip()
+    # Keys are combined as integer codes, so a user id containing the separator cannot collide
+    if 'user_id' in df.columns:
+        users = pd.factorize(df['user_id'].fillna('').astype(str).to_numpy())[0]
+    else:
+        users = np.zeros(n, dtype=np.int64)
+    url_leader = first_of(user_keys(users, urls['normalized_url'].to_numpy()))
+
+    # Exact title duplicates within a domain are linked directly; only distinct titles are MinHashed
+    has_title = (titles != '').to_numpy()
+    # Domains never contain '/', so the joined key cannot mix up domain and title
+    title_leader = first_of(user_keys(users, (domains + '/' + titles).to_numpy()))
+    distinct = np.flatnonzero(has_title & (title_leader == np.arange(n)))
+    signatures = minhash_signatures(titles.to_numpy()[distinct], num_perm, seed)
+    group_codes = pd.factorize(user_keys(users[distinct], domains.to_numpy()[distinct]))[0]
+    members, leaders = near_duplicate_pairs(signatures, group_codes, threshold)
+
+    sources = np.concatenate([np.arange(n), np.flatnonzero(has_title), distinct[members]])
+    targets = np.concatenate([url_leader, title_leader[has_title], distinct[leaders]])
+    graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+    n_components, components = connected_components(graph, directed=False)
+    stats = {
+        'url_groups': int(len(np.unique(url_leader))),
+        'distinct_titles': int(len(distinct)),
+        'near_duplicate_pairs': int(len(members)),
+    }
+    return components, stats
+
+@timed('dedup_history')
+def dedup_history(input_path='data/processed/cleaned_history.csv', output_path='data/processed/deduped_history.csv',
+                  threshold=0.8, num_perm=64, seed=42):
+    """Collapse near-duplicate visits into one representative row with an aggregated weight.
+
+    The first row of each duplicate group is kept. Its weight column holds how many
+    rows it stands for, summing any existing weight, so training with weight as
+    sample_weight sees the same data as training on every row. A visit_count column
+    is summed over the group as well.
+    """
+    try:
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file {input_path} not found")
+        df = read_table(input_path)
+        logger.info(f"Loaded {input_path} with {len(df)} records")
+        count_rows(len(df))
+        start = time.perf_counter()
+
+        components, stats = duplicate_components(df, threshold, num_perm, seed)
+        _, representatives = np.unique(components, return_index=True)
+        representatives.sort()
+        weights = df['weight'].fillna(1).to_numpy(dtype=np.float64) if 'weight' in df.columns else np.ones(len(df))
+        deduped = df.iloc[representatives].reset_index(drop=True)
+        deduped['weight'] = np.bincount(components, weights=weights)[components[representatives]]
+        if 'visit_count' in df.columns:
+            visits = df['visit_count'].fillna(1).to_numpy(dtype=np.float64)
+            deduped['visit_count'] = np.bincount(components, weights=visits)[components[representatives]]
+            deduped['visit_count'] = deduped['visit_count'].astype(np.int64)
+
+        seconds = time.perf_counter() - start
+        reduction = 1 - len(deduped) / len(df) if len(df) else 0.0
+        write_table(deduped, output_path)
+        logger.info(f"Collapsed {len(df)} rows into {len(deduped)} ({reduction:.1%} fewer) in {seconds:.2f}s: "
+                    f"{stats['url_groups']} normalized URLs, {stats['near_duplicate_pairs']} near-duplicate "
+                    f"title pairs among {stats['distinct_titles']} distinct titles")
+        logger.info(f"Saved deduplicated history to {output_path}")
+        annotate(output_rows=len(deduped), reduction=round(reduction, 4), **stats)
+        return deduped
+    except Exception as e:
+        logger.error(f"Deduplication failed: {e}")
+        raise
+
+def main(argv=None):
+    """Command-line entry point for near-duplicate collapsing."""
+    parser = argparse.ArgumentParser(description="Collapse near-duplicate history rows before vectorization.")
+    parser.add_argument('--input', default='data/processed/cleaned_history.csv')
+    parser.add_argument('--output', default='data/processed/deduped_history.csv')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                        help="Estimated Jaccard similarity of title words above which titles are merged")
+    parser.add_argument('--num-perm', type=int, default=64, help="MinHash permutations per title")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    return dedup_history(args.input, args.output, args.threshold, args.num_perm, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include src directory for the shared table readers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logger import setup_logger
+from utils.table_io import iter_table, table_columns, write_table
+from utils.metrics import timed
+
+# Set up logging
+logger = setup_logger('nlp_labeler')
+
+# Per-leaning keyword lexicons; a title scores the summed weight of every keyword occurrence
+DEFAULT_LEXICON = {
+    'republican': {'label': 1, 'keywords': {'trump': 1.0, 'republican': 1.0, 'conservative': 1.0, 'gop': 1.0}},
+    'democrat': {'label': 0, 'keywords': {'democrat': 1.0, 'liberal': 1.0, 'biden': 1.0, 'newsom': 1.0,
+                                          'climate': 1.0}},
+}
+NEUTRAL_LABEL = 2
+
+def load_lexicon(path):
+    """Load a lexicon JSON file shaped like DEFAULT_LEXICON."""
+    with open(path) as f:
+        return json.load(f)
+
+class KeywordLabeler:
+    """Label titles with vectorized passes of combined keyword regexes instead of a per-row loop.
+
+    Each title gets the leaning with the highest summed keyword weight. Titles with no
+    matches, or a tie between the top leanings, get neutral_label; the default of 0
+    keeps the historical behaviour of folding neutral titles into the Democrat class.
+    """
+
+    def __init__(self, lexicon=None, neutral_label=0):
+        lexicon = lexicon or DEFAULT_LEXICON
+        self.leanings = list(lexicon)
+        self.labels = np.array([lexicon[leaning]['label'] for leaning in self.leanings])
+        self.neutral_label = neutral_label
+        self.keyword_class = {}
+        self.keyword_weight = {}
+        for i, leaning in enumerate(self.leanings):
+            for keyword, weight in lexicon[leaning]['keywords'].items():
+                keyword = keyword.lower()
+                if keyword in self.keyword_class:
+                    raise ValueError(f"Keyword {keyword!r} appears in more than one leaning")
+                self.keyword_class[keyword] = i
+                self.keyword_weight[keyword] = float(weight)
+        # Longest keywords first so overlapping alternatives prefer the most specific match
+        self.pattern = self.alternation(self.keyword_class)
+        # Keywords sharing a leaning and weight are counted together in one regex pass
+        groups = {}
+        for keyword, i in self.keyword_class.items():
+            groups.setdefault((i, self.keyword_weight[keyword]), []).append(keyword)
+        self.groups = [(i, weight, self.alternation(keywords)) for (i, weight), keywords in groups.items()]
+
+    @staticmethod
+    def alternation(keywords):
+        """Join keywords into a single regex alternation, longest first."""
+        return '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+
+    def score(self, titles):
+        """Return an (n_titles, n_leanings) array of summed keyword weights.
+
+        One pass of the combined pattern finds the titles with any keyword; only those are
+        counted per leaning, so neutral titles cost a single regex scan.
+        """
+        lowered = pd.Series(titles).fillna('').astype(str).str.lower().reset_index(drop=True)
+        scores = np.zeros((len(lowered), len(self.leanings)))
+        hits = lowered.str.contains(self.pattern).to_numpy(dtype=bool)
+        if hits.any():
+            matched = lowered[hits]
+            for i, weight, pattern in self.groups:
+                scores[hits, i] += weight * matched.str.count(pattern).to_numpy(dtype=np.float64)
+        return scores
+
+    def label(self, titles):
+        """Return one integer label per title."""
+        scores = self.score(titles)
+        best = scores.argmax(axis=1)
+        top = scores.max(axis=1)
+        ties = (scores == top[:, None]).sum(axis=1) > 1
+        labels = self.labels[best]
+        labels[(top <= 0) | ties] = self.neutral_label
+        return labels
+
+def title_text(df):
+    """Prefer the cleaned title and fall back to the raw title, as the labeling always has."""
+    if 'cleaned_title' in df.columns and 'title' in df.columns:
+        return df['cleaned_title'].fillna(df['title'])
+    return df['cleaned_title'] if 'cleaned_title' in df.columns else df['title']
+
+@timed('generate_labels', rows=len)
+def generate_labels(input_path='data/processed/cleaned_history.csv', output_path='data/labels.csv',
+                    lexicon=None, neutral_label=0, chunksize=1_000_000):
+    """Label a history table chunk by chunk and write a single 'label' column."""
+    try:
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file {input_path} not found")
+        labeler = KeywordLabeler(lexicon, neutral_label)
+        columns = [c for c in ['cleaned_title', 'title'] if c in table_columns(input_path)]
+        if not columns:
+            raise ValueError("Input must contain a 'cleaned_title' or 'title' column")
+        labels = []
+        for chunk in iter_table(input_path, columns=columns, chunksize=chunksize):
+            labels.append(labeler.label(title_text(chunk)))
+        labels = np.concatenate(labels) if labels else np.array([], dtype=np.int64)
+        write_table(pd.DataFrame({'label': labels}), output_path)
+        counts = pd.Series(labels).value_counts().sort_index().to_dict()
+        logger.info(f"Saved {len(labels)} labels to {output_path} (counts per label: {counts})")
+        return labels
+    except Exception as e:
+        logger.error(f"Labeling failed: {e}")
+        raise
+
+def main(argv=None):
+    """Command-line entry point for keyword labeling."""
+    parser = argparse.ArgumentParser(description="Label browser history titles with keyword lexicons.")
+    parser.add_argument('--input', help="History table (default: cleaned history, else raw user1 history)")
+    parser.add_argument('--output', default='data/labels.csv')
+    parser.add_argument('--lexicon', help="JSON lexicon file shaped like DEFAULT_LEXICON")
+    parser.add_argument('--neutral-label', type=int, default=0,
+                        help=f"Label for titles without a clear leaning (use {NEUTRAL_LABEL} for a separate class)")
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    input_path = args.input
+    if input_path is None:
+        cleaned_path = 'data/processed/cleaned_history.csv'
+        input_path = cleaned_path if os.path.exists(cleaned_path) else 'data/raw/user1_history.csv'
+    lexicon = load_lexicon(args.lexicon) if args.lexicon else None
+    return generate_labels(input_path, args.output, lexicon, args.neutral_label, args.chunksize)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,46 @@
+import argparse
 import pandas as pd
-import spacy
 import re
 import os
-from utils.logger import setup_logger
+import sys
+import glob
+import json
+from functools import lru_cache
+
+# Adjust sys.path to include src directory for the shared table readers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Load SpaCy model
-nlp = spacy.load('en_core_web_sm', disable=['parser', 'ner'])  # Disable unused components for efficiency
+from utils.logger import setup_logger
+from utils.table_io import FORMATS, read_table, write_table, append_table
+from utils.metrics import stage_timer, timed
+from text_cache import CleanTextCache
+from url_features import featurize_urls
 
 # Set up logging
 logger = setup_logger('nlp_preprocess')
 
-def clean_text(text):
+@lru_cache(maxsize=None)
+def get_nlp():
+    """Load the SpaCy model on first use, so importing this module stays cheap, and reuse it afterwards."""
+    import spacy
+    return spacy.load('en_core_web_sm', disable=['parser', 'ner'])  # Disable unused components for efficiency
+
+def doc_to_text(doc):
+    """Join the lemmas of non-stopword tokens in a SpaCy doc."""
+    tokens = [token.lemma_ for token in doc if not token.is_stop and token.text.strip()]
+    return ' '.join(tokens)
+
+def cache_namespace():
+    """Identify the loaded SpaCy model so cached lemmas are invalidated when it changes."""
+    meta = get_nlp().meta
+    return f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}"
+
+def open_cache(cache_path='data/cache/clean_text.sqlite', max_memory_entries=100_000,
+               max_disk_entries=5_000_000):
+    """Open the persistent clean_text cache for the loaded SpaCy model."""
+    return CleanTextCache(cache_path, cache_namespace(), max_memory_entries, max_disk_entries)
+
+def clean_text(text, cache=None):
     """Clean text by removing URLs, punctuation, and stopwords, and applying lemmatization."""
     if not isinstance(text, str):
         return ''
@@ -18,40 +48,192 @@ def clean_text(text):
     text = text.lower()
     text = re.sub(r'[^\w\s]', '', text)
     text = re.sub(r'\d+', '', text)
-    doc = nlp(text)
-    tokens = [token.lemma_ for token in doc if not token.is_stop and token.text.strip()]
-    return ' '.join(tokens)
+    if cache is not None:
+        cached = cache.get(text)
+        if cached is not None:
+            return cached
+    doc = get_nlp()(text)
+    cleaned = doc_to_text(doc)
+    if cache is not None:
+        cache.put(text, cleaned)
+    return cleaned
+
+def pre_clean_series(series):
+    """Apply the regex steps of clean_text to a whole Series with vectorized .str operations."""
+    is_text = series.map(lambda x: isinstance(x, str)).astype(bool)
+    # Object dtype keeps the replacements on Python's re; arrow-backed strings would use RE2, whose \w and
+    # \d only match ASCII, and so drop accented letters that clean_text keeps
+    text = series.where(is_text, '').astype(str).astype(object)
+    text = text.str.replace(r'http[s]?://\S+', '', regex=True)
+    text = text.str.lower()
+    text = text.str.replace(r'[^\w\s]', '', regex=True)
+    text = text.str.replace(r'\d+', '', regex=True)
+    return text
 
-def preprocess_history(input_paths, output_path='data/processed/cleaned_history.csv'):
-    """Preprocess browser history CSVs and save cleaned data."""
+def clean_columns(df, columns=('title', 'url'), batch_size=1000, n_process=1, cache=None):
+    """Clean several text columns in one batched nlp.pipe pass; matches clean_text row for row.
+
+    Each distinct pre-cleaned text is lemmatized once, and texts already in the
+    cache are not sent to SpaCy at all.
+    """
+    pre_cleaned = [pre_clean_series(df[column]) for column in columns]
+    texts = pd.concat(pre_cleaned, ignore_index=True)
+    unique_texts = texts.unique().tolist()
+    lemmas = cache.get_many(unique_texts) if cache is not None else {}
+    misses = [text for text in unique_texts if text not in lemmas]
+    docs = get_nlp().pipe(misses, batch_size=batch_size, n_process=n_process)
+    computed = {text: doc_to_text(doc) for text, doc in zip(misses, docs)}
+    if cache is not None:
+        cache.put_many(computed)
+    lemmas.update(computed)
+    cleaned = texts.map(lemmas).tolist()
+    results = {}
+    for i, column in enumerate(columns):
+        start = i * len(df)
+        results[column] = pd.Series(cleaned[start:start + len(df)], index=df.index)
+    return results
+
+def resolve_input_paths(input_paths):
+    """Expand each input table into itself plus any incremental partitions written next to it.
+
+    A directory, such as the dataset written by extract_profiles, expands to every table under it.
+    """
+    resolved = []
+    for path in input_paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', '*'), recursive=True)
+            resolved.extend(sorted(match for match in matches if os.path.splitext(match)[1] in FORMATS))
+            continue
+        partitions = sorted(
+            partition for partition in glob.glob(os.path.join(os.path.splitext(path)[0], 'part-*'))
+            if os.path.splitext(partition)[1] in FORMATS
+        )
+        if os.path.exists(path):
+            resolved.append(path)
+        elif not partitions:
+            logger.warning(f"Input file {path} not found")
+        resolved.extend(partitions)
+    # A partition listed both on its own and through its base table is read once
+    return list(dict.fromkeys(resolved))
+
+def source_user_id(path):
+    """Derive a user id from a history file name: data/raw/user1_history.csv and its partitions -> user1."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem.startswith('part-'):
+        stem = os.path.basename(os.path.dirname(path))
+    return stem[:-len('_history')] if stem.endswith('_history') else stem
+
+def file_signature(path):
+    """Identify an input file's content by its size and modification time."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_processed_partitions(state_path):
+    """Return {input file: signature} for the files folded into the cleaned output, or None without a usable state.
+
+    State written by older versions lists paths only, so it cannot tell whether a file changed; it counts as missing.
+    """
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        state = json.load(f)
+    return state if isinstance(state, dict) else None
+
+@timed('preprocess_history', rows=len)
+def preprocess_history(input_paths, output_path='data/processed/cleaned_history.csv',
+                       batch_size=1000, n_process=1, cache_path='data/cache/clean_text.sqlite',
+                       incremental=False, url_cleaner='fast'):
+    """Preprocess browser history CSVs and save cleaned data.
+
+    Inputs and output may be CSV, Parquet or Arrow IPC, chosen by file extension.
+    Pass cache_path=None to disable the persistent clean_text cache. With incremental=True
+    only input files and partitions not processed by an earlier run are cleaned, and their
+    rows are appended to output_path. The output is rebuilt from every input instead when
+    the state file is missing or an already processed file has changed size or mtime.
+    url_cleaner='fast' tokenizes URLs with url_features and adds a domain column;
+    url_cleaner='spacy' runs URLs through clean_text as before.
+    Rows keep a user_id column, taken from the input file name when the input has none.
+    """
+    if url_cleaner not in ('fast', 'spacy'):
+        raise ValueError(f"Unknown url_cleaner {url_cleaner!r}, expected 'fast' or 'spacy'")
+    cache = open_cache(cache_path) if cache_path else None
+    state_path = os.path.splitext(output_path)[0] + '_partitions.json'
     try:
-        dfs = []
-        for path in input_paths:
-            if os.path.exists(path):
-                df = pd.read_csv(path)
-                dfs.append(df)
-                logger.info(f"Loaded {path} with {len(df)} records")
+        paths = resolve_input_paths(input_paths)
+        signatures = {path: file_signature(path) for path in paths}
+        processed = load_processed_partitions(state_path) if incremental else None
+        append = False
+        if incremental:
+            changed = [path for path in paths if path in (processed or {}) and processed[path] != signatures[path]]
+            if processed is None or not os.path.exists(output_path):
+                logger.info(f"No preprocessing state for {output_path}; rebuilding it from every input")
+            elif changed:
+                logger.info(f"{len(changed)} processed inputs changed since the last run, e.g. {changed[0]}; "
+                            f"rebuilding {output_path} from every input")
             else:
-                logger.warning(f"Input file {path} not found")
+                paths = [path for path in paths if path not in processed]
+                if not paths:
+                    logger.info("No new input partitions to preprocess")
+                    return pd.DataFrame()
+                append = True
+        dfs = []
+        for path in paths:
+            df = read_table(path)
+            # Keep track of whose history each row is, so scores can be aggregated per user
+            if 'user_id' not in df.columns:
+                df['user_id'] = source_user_id(path)
+            dfs.append(df)
+            logger.info(f"Loaded {path} with {len(df)} records")
         if not dfs:
             raise FileNotFoundError("No input files found")
         combined_df = pd.concat(dfs, ignore_index=True)
-        combined_df['cleaned_title'] = combined_df['title'].apply(clean_text)
-        combined_df['cleaned_url'] = combined_df['url'].apply(clean_text)
+        with stage_timer('clean_text', rows=len(combined_df), url_cleaner=url_cleaner):
+            if url_cleaner == 'fast':
+                cleaned = clean_columns(combined_df, ('title',), batch_size, n_process, cache)
+                url_features = featurize_urls(combined_df['url'])
+                combined_df['cleaned_title'] = cleaned['title']
+                combined_df['cleaned_url'] = url_features['cleaned_url']
+                combined_df['domain'] = url_features['domain']
+            else:
+                cleaned = clean_columns(combined_df, ('title', 'url'), batch_size, n_process, cache)
+                combined_df['cleaned_title'] = cleaned['title']
+                combined_df['cleaned_url'] = cleaned['url']
+        logger.info(f"Cleaned {len(combined_df)} titles and urls (batch_size={batch_size}, n_process={n_process})")
+        if cache is not None:
+            stats = cache.stats()
+            logger.info(
+                f"Clean text cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
+            )
         combined_df = combined_df[
             (combined_df['cleaned_title'] != '') | (combined_df['cleaned_url'] != '')
         ]
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        combined_df.to_csv(output_path, index=False)
-        logger.info(f"Saved cleaned history to {output_path} with {len(combined_df)} records")
+        if append:
+            append_table(combined_df, output_path)
+            logger.info(f"Appended {len(combined_df)} cleaned records to {output_path}")
+        else:
+            write_table(combined_df, output_path)
+            logger.info(f"Saved cleaned history to {output_path} with {len(combined_df)} records")
+        state = {**processed, **{path: signatures[path] for path in paths}} if append else signatures
+        with open(state_path, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
         return combined_df
     except Exception as e:
         logger.error(f"Preprocessing failed: {e}")
         raise
+    finally:
+        if cache is not None:
+            cache.close()
 
 if __name__ == "__main__":
-    input_paths = [
-        'data/raw/user1_history.csv',
-        'data/raw/user2_history.csv'
-    ]
-    preprocess_history(input_paths)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean browser history tables for vectorization.")
+    parser.add_argument('inputs', nargs='*', default=['data/raw/user1_history.csv', 'data/raw/user2_history.csv'],
+                        help="History tables to clean")
+    parser.add_argument('--output', default='data/processed/cleaned_history.csv')
+    parser.add_argument('--incremental', action='store_true', help="Only clean partitions not processed before")
+    parser.add_argument('--url-cleaner', choices=['fast', 'spacy'], default='fast')
+    parser.add_argument('--batch-size', type=int, default=1000, help="Texts per SpaCy nlp.pipe batch")
+    parser.add_argument('--n-process', type=int, default=1, help="SpaCy worker processes")
+    args = parser.parse_args()
+    preprocess_history(args.inputs, args.output, batch_size=args.batch_size, n_process=args.n_process,
+                       incremental=args.incremental, url_cleaner=args.url_cleaner)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+SQLITE_MAX_PARAMS = 900
+
+class CleanTextCache:
+    """Content-addressed cache of clean_text output with an in-memory LRU and an on-disk SQLite tier."""
+
+    def __init__(self, path=None, namespace='', max_memory_entries=100_000, max_disk_entries=5_000_000):
+        self.path = path
+        self.namespace = namespace
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS clean_text_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_clean_text_cache_last_used ON clean_text_cache (last_used)"
+            )
+            self.conn.commit()
+
+    def key(self, text):
+        """Hash the normalized text together with the cache namespace."""
+        return hashlib.sha1(f"{self.namespace}\0{text}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, text):
+        """Return the cached value for text, or None on a miss."""
+        return self.get_many([text]).get(text)
+
+    def put(self, text, value):
+        """Store the cleaned value for text in both tiers."""
+        self.put_many({text: value})
+
+    def get_many(self, texts):
+        """Look up many texts at once and return a dict of the ones found."""
+        found = {}
+        pending = {}
+        for text in texts:
+            key = self.key(text)
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                found[text] = self.memory[key]
+                self.memory_hits += 1
+            else:
+                pending[key] = text
+        if pending and self.conn is not None:
+            keys = list(pending)
+            now = int(time.time())
+            for i in range(0, len(keys), SQLITE_MAX_PARAMS):
+                chunk = keys[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM clean_text_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value in rows:
+                    found[pending.pop(key)] = value
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                if rows:
+                    self.conn.executemany(
+                        "UPDATE clean_text_cache SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+            self.conn.commit()
+        self.misses += len(pending)
+        return found
+
+    def put_many(self, mapping):
+        """Store many text -> cleaned value pairs and evict the least recently used disk entries."""
+        rows = []
+        now = int(time.time())
+        for text, value in mapping.items():
+            key = self.key(text)
+            self._remember(key, value)
+            rows.append((key, value, now))
+        if rows and self.conn is not None:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO clean_text_cache (key, value, last_used) VALUES (?, ?, ?)", rows
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM clean_text_cache").fetchone()[0]
+            if count > self.max_disk_entries:
+                self.conn.execute(
+                    "DELETE FROM clean_text_cache WHERE key IN "
+                    "(SELECT key FROM clean_text_cache ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_disk_entries,)
+                )
+            self.conn.commit()
+
+    def stats(self):
+        """Return hit and miss counters."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hit_rate = (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hit_rate,
+        }
+
+    def close(self):
+        """Close the SQLite connection."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,86 @@
+import re
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import pandas as pd
+
+# Split on anything that is not a letter (separators, digits, punctuation) and on camelCase boundaries.
+# Letters are Unicode word characters, as pre_clean_series keeps them in titles
+NON_LETTERS = re.compile(r'[\W\d_]+')
+CAMEL_CASE = re.compile(r'(?<=[a-z])(?=[A-Z])')
+URL_STOPWORDS = {
+    'http', 'https', 'www', 'com', 'org', 'net', 'co', 'uk', 'html', 'htm', 'php', 'asp', 'aspx', 'jsp',
+    'index', 'amp', 'id', 'ref', 'utm',
+}
+TRACKING_KEYS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref', 'ref_src'}
+# Public suffixes of two labels, under which the registrable domain keeps three labels (bbc.co.uk).
+# Any other country-code host keeps two, so cbc.ca and faz.de are domains of their own
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'net.uk', 'ltd.uk', 'plc.uk', 'sch.uk', 'nhs.uk', 'police.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'asn.au', 'id.au',
+    'co.nz', 'net.nz', 'org.nz', 'ac.nz', 'govt.nz',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp', 'co.kr', 'or.kr', 'go.kr',
+    'co.in', 'net.in', 'org.in', 'gov.in', 'ac.in', 'co.za', 'org.za', 'gov.za', 'ac.za',
+    'com.br', 'net.br', 'org.br', 'gov.br', 'com.mx', 'org.mx', 'gob.mx', 'com.ar', 'gob.ar',
+    'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'com.hk', 'com.tw', 'com.sg', 'gov.sg', 'com.my', 'co.id',
+    'com.ph', 'co.th', 'com.vn', 'com.pk', 'com.tr', 'gov.tr', 'co.il', 'org.il', 'com.sa', 'com.eg',
+    'com.ng', 'co.ke', 'com.ua',
+}
+
+def split_url(url):
+    """Parse a URL into (hostname, percent-decoded path segments, query keys); schemeless URLs are accepted."""
+    if not isinstance(url, str) or not url:
+        return '', [], []
+    try:
+        parts = urlsplit(url if '//' in url else f'//{url}')
+        hostname = parts.hostname or ''
+    except ValueError:
+        return '', [], []
+    segments = [unquote(segment) for segment in parts.path.split('/') if segment]
+    keys = [key for key, _ in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_KEYS and not key.lower().startswith('utm_')]
+    return hostname, segments, keys
+
+def url_domain(hostname):
+    """Reduce a hostname to its registrable domain, e.g. edition.cnn.com -> cnn.com, bbc.co.uk -> bbc.co.uk."""
+    labels = [label for label in hostname.lower().split('.') if label]
+    if len(labels) > 2 and labels[0] == 'www':
+        labels = labels[1:]
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def word_tokens(text):
+    """Split a URL component into lowercase word tokens on separators and camel case."""
+    tokens = []
+    for piece in NON_LETTERS.split(CAMEL_CASE.sub(' ', text)):
+        piece = piece.lower()
+        if len(piece) > 1 and piece not in URL_STOPWORDS:
+            tokens.append(piece)
+    return tokens
+
+def url_tokens(hostname, segments, keys):
+    """Join the word tokens of a parsed URL's host, path segments and query keys."""
+    tokens = word_tokens(hostname)
+    for component in segments + keys:
+        tokens.extend(word_tokens(component))
+    return ' '.join(tokens)
+
+def clean_url(url):
+    """Turn a URL into space-separated word tokens from its host, path segments and query keys."""
+    return url_tokens(*split_url(url))
+
+def featurize_urls(urls):
+    """Build cleaned_url and domain columns for a Series of URLs without SpaCy.
+
+    Each distinct URL is parsed once, so repeated visits cost a dictionary lookup.
+    """
+    unique_urls = pd.unique(urls)
+    cleaned, domains = {}, {}
+    for url in unique_urls:
+        hostname, segments, keys = split_url(url)
+        cleaned[url] = url_tokens(hostname, segments, keys)
+        domains[url] = url_domain(hostname)
+    return pd.DataFrame({
+        'cleaned_url': urls.map(cleaned).fillna(''),
+        'domain': urls.map(domains).fillna(''),
+    }, index=urls.index)
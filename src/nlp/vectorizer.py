@@ -1,36 +1,108 @@
+import argparse
 import pandas as pd
 import os
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+import sys
+import json
+import pickle
+
+# Adjust sys.path to include src directory for the shared table readers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 from utils.logger import setup_logger
+from utils.table_io import read_table, table_columns, write_table
+from utils.metrics import timed
 
 # Set up logging
 logger = setup_logger('nlp_vectorize')
 
-def vectorize_text(input_path='data/processed/cleaned_history.csv', output_path='data/processed/tfidf_features.pkl'):
-    """Vectorize cleaned text using TF-IDF and save the result."""
+def compose_text(df, domain_features=True):
+    """Join cleaned title and url, plus one domain_<name> token when a domain column is present."""
+    text = df['cleaned_title'].fillna('') + ' ' + df['cleaned_url'].fillna('')
+    if domain_features and 'domain' in df.columns:
+        domain = df['domain'].fillna('').astype(str)
+        token = 'domain_' + domain.str.replace(r'[^0-9a-zA-Z]', '_', regex=True)
+        text = text + ' ' + token.where(domain != '', '')
+    return text
+
+# Per-row metadata kept next to the feature matrix: user_id traces scores back to users, and weight
+# (added by dedup_history) is how many history rows a feature row stands for
+ROW_COLUMNS = ['user_id', 'weight']
+
+def vocabulary_path_for(features_path):
+    """Return the vocabulary file that sits next to a sparse feature file."""
+    return os.path.splitext(features_path)[0] + '_vocabulary.json'
+
+def rows_path_for(features_path):
+    """Return the per-row metadata table that sits next to a feature file."""
+    return os.path.splitext(features_path)[0] + '_rows.csv'
+
+def save_sparse_features(tfidf_matrix, feature_names, output_path):
+    """Save a CSR matrix as .npz and its column names as a JSON vocabulary file."""
+    from scipy import sparse
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    sparse.save_npz(output_path, tfidf_matrix.tocsr(), compressed=False)
+    vocabulary_path = vocabulary_path_for(output_path)
+    with open(vocabulary_path, 'w') as f:
+        json.dump(list(feature_names), f)
+    return vocabulary_path
+
+def load_sparse_features(features_path):
+    """Load a CSR matrix and its column names saved by save_sparse_features."""
+    from scipy import sparse
+    tfidf_matrix = sparse.load_npz(features_path).tocsr()
+    with open(vocabulary_path_for(features_path)) as f:
+        feature_names = json.load(f)
+    return tfidf_matrix, feature_names
+
+@timed('vectorize_text', rows=lambda result: result[0].shape[0])
+def vectorize_text(input_path='data/processed/cleaned_history.csv', output_path='data/processed/tfidf_features.npz',
+                   dense_pickle=False, vectorizer_path='models/tfidf_vectorizer.pkl', domain_features=True):
+    """Vectorize cleaned text using TF-IDF and save the result.
+
+    input_path may be CSV, Parquet or Arrow IPC, chosen by file extension.
+
+    Features are stored sparse (CSR .npz plus a JSON vocabulary). Set dense_pickle=True
+    to write the legacy dense DataFrame pickle instead. When the input has user_id or weight
+    columns they are written row-aligned to <output>_rows.csv.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
     try:
         # Load cleaned data
         if not os.path.exists(input_path):
             raise FileNotFoundError(f"Input file {input_path} not found")
-        df = pd.read_csv(input_path)
+        available = table_columns(input_path)
+        columns = [c for c in ['cleaned_title', 'cleaned_url', 'domain'] + ROW_COLUMNS if c in available]
+        df = read_table(input_path, columns=columns)
         logger.info(f"Loaded {input_path} with {len(df)} records")
 
-        # Combine cleaned_title and cleaned_url for vectorization
-        text_data = df['cleaned_title'].fillna('') + ' ' + df['cleaned_url'].fillna('')
+        # Combine cleaned_title, cleaned_url and the domain token for vectorization
+        text_data = compose_text(df, domain_features)
 
         # Initialize TF-IDF vectorizer
         vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
         tfidf_matrix = vectorizer.fit_transform(text_data)
 
-        # Convert to DataFrame or save as pickle
-        feature_names = vectorizer.get_feature_names_out()
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=feature_names)
-
         # Save the vectorized features
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        tfidf_df.to_pickle(output_path)
+        feature_names = vectorizer.get_feature_names_out()
+        if dense_pickle:
+            tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=feature_names)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            tfidf_df.to_pickle(output_path)
+        else:
+            vocabulary_path = save_sparse_features(tfidf_matrix, feature_names, output_path)
+            logger.info(f"Saved TF-IDF vocabulary to {vocabulary_path}")
         logger.info(f"Saved TF-IDF features to {output_path} with shape {tfidf_matrix.shape}")
+        row_columns = [c for c in ROW_COLUMNS if c in df.columns]
+        if row_columns:
+            write_table(df[row_columns], rows_path_for(output_path))
+            logger.info(f"Saved per-row {', '.join(row_columns)} to {rows_path_for(output_path)}")
+
+        # Save the fitted vectorizer so inference reproduces the training features
+        if vectorizer_path:
+            os.makedirs(os.path.dirname(vectorizer_path), exist_ok=True)
+            with open(vectorizer_path, 'wb') as f:
+                pickle.dump(vectorizer, f)
+            logger.info(f"Saved TF-IDF vectorizer to {vectorizer_path}")
 
         return tfidf_matrix, vectorizer
 
@@ -39,4 +111,9 @@ def vectorize_text(input_path='data/processed/cleaned_history.csv', output_path=
         raise
 
 if __name__ == "__main__":
-    vectorize_text()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fit TF-IDF on cleaned history and save sparse features.")
+    parser.add_argument('--input', default='data/processed/cleaned_history.csv')
+    parser.add_argument('--output', default='data/processed/tfidf_features.npz')
+    parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl')
+    args = parser.parse_args()
+    vectorize_text(args.input, args.output, vectorizer_path=args.vectorizer_path)
@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+SRC_DIR = os.path.abspath(os.path.dirname(__file__))
+# Adjust sys.path to include each stage directory so stage modules import as they do when run as scripts
+for stage_dir in ('scrape', 'nlp', 'models'):
+    sys.path.append(os.path.join(SRC_DIR, stage_dir))
+
+from utils.logger import setup_logger
+
+# Set up logging
+logger = setup_logger('pipeline')
+
+DEFAULT_PARAMS = {
+    'start_date': '2025-01-01',
+    'end_date': '2025-07-19',
+    'keywords': ['politics', 'news'],
+    'granularity': 'url',
+    'read_mode': 'auto',
+    'url_cleaner': 'fast',
+    'dedup_threshold': 0.8,
+}
+
+class Stage:
+    """One pipeline step: a function with the files it reads and writes and the params it depends on.
+
+    inputs is a list of paths or a callable returning one, for inputs such as browser
+    databases that are only located at run time. optional_inputs are history tables the
+    stage uses when they exist, together with their incremental partitions; a failed
+    upstream stage that only feeds optional inputs does not block this one. code lists
+    the source files (relative to src/) whose changes invalidate the stage's outputs.
+    """
+
+    def __init__(self, name, func, inputs, outputs, params=None, code=(), optional_inputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.code = list(code)
+        self.optional_inputs = list(optional_inputs)
+
+    def required_inputs(self):
+        """Required inputs known without running anything."""
+        return [] if callable(self.inputs) else list(self.inputs)
+
+    def static_inputs(self):
+        """Inputs known without running anything; used to link stages into a DAG."""
+        return self.required_inputs() + self.optional_inputs
+
+    def resolve_inputs(self):
+        """Return the concrete input paths for this run, with optional tables expanded to what exists."""
+        inputs = list(self.inputs()) if callable(self.inputs) else list(self.inputs)
+        return inputs + existing_tables(self.optional_inputs)
+
+def existing_tables(paths):
+    """Return the tables among paths that exist, plus the partitions written next to them, as preprocess reads them.
+
+    Listing partitions here puts them in the stage fingerprint, so a new partition reruns the stage.
+    """
+    from preprocess import resolve_input_paths
+    return resolve_input_paths([path for path in paths
+                                if os.path.exists(path) or os.path.isdir(os.path.splitext(path)[0])])
+
+def chromium_inputs():
+    from chrome_history import get_chromium_history_path
+    return [get_chromium_history_path()[0]]
+
+def firefox_inputs():
+    from firefox_history import get_firefox_history_path
+    return [get_firefox_history_path()]
+
+def run_chrome(inputs, outputs, start_date, end_date, keywords, granularity, read_mode):
+    from chrome_history import get_chromium_history_path, extract_chromium_history
+    _, browser = get_chromium_history_path()
+    extract_chromium_history(inputs[0], outputs[0], datetime.fromisoformat(start_date) if start_date else None,
+                             datetime.fromisoformat(end_date) if end_date else None, keywords,
+                             profile_key=f"{browser}:{inputs[0]}", read_mode=read_mode, granularity=granularity)
+
+def run_firefox(inputs, outputs, start_date, end_date, keywords, granularity, read_mode):
+    from firefox_history import extract_firefox_history
+    extract_firefox_history(inputs[0], outputs[0], profile_key=f"firefox:{inputs[0]}", read_mode=read_mode,
+                            start_date=datetime.fromisoformat(start_date) if start_date else None,
+                            end_date=datetime.fromisoformat(end_date) if end_date else None, keywords=keywords,
+                            granularity=granularity)
+
+def run_preprocess(inputs, outputs, url_cleaner):
+    from preprocess import preprocess_history
+    preprocess_history(inputs, outputs[0], url_cleaner=url_cleaner)
+
+def run_dedup(inputs, outputs, threshold):
+    from dedup import dedup_history
+    dedup_history(inputs[0], outputs[0], threshold=threshold)
+
+def run_labels(inputs, outputs):
+    from labeler import generate_labels
+    generate_labels(inputs[0], outputs[0])
+
+def run_vectorize(inputs, outputs):
+    from vectorizer import vectorize_text
+    vectorize_text(inputs[0], outputs[0], vectorizer_path=outputs[2])
+
+def run_train(inputs, outputs):
+    from train_classifier import train_classifier
+    train_classifier(inputs[0], inputs[1], outputs[0], vectorizer_path=inputs[2],
+                     bundle_dir=os.path.dirname(outputs[1]))
+
+def build_stages(params=None):
+    """Declare the scrape -> preprocess -> dedup -> labels -> vectorize -> train chain with its default paths."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    raw = ['data/raw/user1_history.csv', 'data/raw/user2_history.csv']
+    cleaned = 'data/processed/cleaned_history.csv'
+    deduped = 'data/processed/deduped_history.csv'
+    features = 'data/processed/tfidf_features.npz'
+    feature_rows = 'data/processed/tfidf_features_rows.csv'
+    vectorizer = 'models/tfidf_vectorizer.pkl'
+    # Shared modules every stage imports
+    shared = ['utils/table_io.py', 'utils/metrics.py']
+    scrape = ['scrape/utils/history_db.py', 'scrape/utils/watermarks.py']
+    # Both browsers get the same filters and granularity, so their tables share one schema
+    scrape_params = {name: params[name] for name in ('start_date', 'end_date', 'keywords', 'granularity', 'read_mode')}
+    return [
+        Stage('chrome', run_chrome, chromium_inputs, [raw[0]], scrape_params,
+              ['scrape/chrome_history.py'] + scrape + shared),
+        Stage('firefox', run_firefox, firefox_inputs, [raw[1]], scrape_params,
+              ['scrape/firefox_history.py'] + scrape + shared),
+        # Runs on whichever browsers were extracted, so a machine with one browser still trains a model
+        Stage('preprocess', run_preprocess, [], [cleaned], {'url_cleaner': params['url_cleaner']},
+              ['nlp/preprocess.py', 'nlp/text_cache.py', 'nlp/url_features.py'] + shared, optional_inputs=raw),
+        Stage('dedup', run_dedup, [cleaned], [deduped], {'threshold': params['dedup_threshold']},
+              ['nlp/dedup.py', 'nlp/url_features.py'] + shared),
+        Stage('labels', run_labels, [deduped], ['data/labels.csv'], code=['nlp/labeler.py'] + shared),
+        Stage('vectorize', run_vectorize, [deduped],
+              [features, 'data/processed/tfidf_features_vocabulary.json', vectorizer, feature_rows],
+              code=['nlp/vectorizer.py'] + shared),
+        # The rows table carries the dedup weights used as sample_weight
+        Stage('train', run_train, [features, 'data/labels.csv', vectorizer, feature_rows],
+              ['models/logistic_regression.pkl', 'models/logistic_regression_bundle/manifest.json'],
+              code=['models/train_classifier.py', 'models/bundle.py', 'nlp/vectorizer.py'] + shared),
+    ]
+
+def load_state(state_path):
+    """Load stage fingerprints and cached file hashes from an earlier run."""
+    if not os.path.exists(state_path):
+        return {'files': {}, 'stages': {}}
+    with open(state_path) as f:
+        return json.load(f)
+
+def save_state(state, state_path):
+    """Persist the pipeline state atomically."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    # Worker threads may still be adding file hashes, so write a snapshot
+    snapshot = {'files': dict(state['files']), 'stages': dict(state['stages'])}
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def file_digest(path, files):
+    """SHA-256 of a file's content, reusing the stored hash while its size and mtime are unchanged.
+
+    A SQLite database's -wal sidecar is folded in, since unflushed visits live there.
+    """
+    digest = hashlib.sha256()
+    for part in [path, f"{path}-wal"]:
+        if part != path and not os.path.exists(part):
+            continue
+        stat = os.stat(part)
+        cached = files.get(part)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            part_hash = cached[2]
+        else:
+            part_digest = hashlib.sha256()
+            with open(part, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    part_digest.update(block)
+            part_hash = part_digest.hexdigest()
+            files[part] = [stat.st_size, stat.st_mtime_ns, part_hash]
+        digest.update(part_hash.encode('utf-8'))
+    return digest.hexdigest()
+
+def stage_fingerprint(stage, inputs, files):
+    """Hash a stage's name, params, input contents and source code into one key."""
+    for path in inputs:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Input file {path} not found")
+    key = {
+        'stage': stage.name,
+        'params': stage.params,
+        'inputs': [[path, file_digest(path, files)] for path in inputs],
+        'code': [[path, file_digest(os.path.join(SRC_DIR, path), files)] for path in stage.code],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+def is_current(stage, fingerprint, state, files):
+    """A stage is current when its fingerprint matches and its outputs are unchanged since it ran."""
+    record = state['stages'].get(stage.name)
+    if not record or record['fingerprint'] != fingerprint:
+        return False
+    return all(os.path.exists(path) and file_digest(path, files) == record['outputs'].get(path)
+               for path in stage.outputs)
+
+def run_stage(stage, state, force, lock):
+    """Run one stage unless its outputs are current; return (status, seconds, error)."""
+    start = time.perf_counter()
+    try:
+        inputs = stage.resolve_inputs()
+        fingerprint = stage_fingerprint(stage, inputs, state['files'])
+        if not force and is_current(stage, fingerprint, state, state['files']):
+            logger.info(f"Stage {stage.name} is up to date")
+            return 'cached', time.perf_counter() - start, None
+        logger.info(f"Running stage {stage.name}")
+        stage.func(inputs, stage.outputs, **stage.params)
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Stage did not write {', '.join(missing)}")
+        outputs = {path: file_digest(path, state['files']) for path in stage.outputs}
+        with lock:
+            state['stages'][stage.name] = {'fingerprint': fingerprint, 'outputs': outputs,
+                                           'finished': datetime.now().isoformat(timespec='seconds')}
+        return 'ran', time.perf_counter() - start, None
+    except Exception as e:
+        logger.error(f"Stage {stage.name} failed: {e}")
+        return 'failed', time.perf_counter() - start, str(e)
+
+def run_pipeline(stage_names=None, params=None, force=False, max_workers=4,
+                 state_path='data/cache/pipeline_state.json'):
+    """Run the selected stages (all by default) in dependency order, skipping current ones.
+
+    Stages are linked by matching outputs to inputs; stages whose dependencies are done
+    run concurrently in a thread pool, so Chrome and Firefox extraction overlap. A stage
+    whose upstream stage failed is marked blocked, unless that stage only feeds its optional
+    inputs. Returns {stage: (status, seconds, error)}.
+    """
+    stages = build_stages(params)
+    names = [stage.name for stage in stages]
+    unknown = [name for name in stage_names or [] if name not in names]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}, expected some of {names}")
+    selected = [stage for stage in stages if not stage_names or stage.name in stage_names]
+    deps = {
+        stage.name: {other.name for other in selected
+                     if other is not stage and set(other.outputs) & set(stage.static_inputs())}
+        for stage in selected
+    }
+    required = {
+        stage.name: {other.name for other in selected
+                     if other is not stage and set(other.outputs) & set(stage.required_inputs())}
+        for stage in selected
+    }
+
+    state = load_state(state_path)
+    lock = threading.Lock()
+    results = {}
+    pending = list(selected)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                statuses = [results[dep][0] for dep in deps[stage.name] if dep in results]
+                if any(results[dep][0] in ('failed', 'blocked') for dep in required[stage.name] if dep in results):
+                    results[stage.name] = ('blocked', 0.0, 'upstream stage failed')
+                    pending.remove(stage)
+                elif len(statuses) == len(deps[stage.name]):
+                    running[executor.submit(run_stage, stage, state, force, lock)] = stage
+                    pending.remove(stage)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future).name] = future.result()
+            with lock:
+                save_state(state, state_path)
+    return {stage.name: results[stage.name] for stage in selected}
+
+def print_summary(results):
+    """Print per-stage status and wall time, then the totals."""
+    print(f"{'stage':<12} {'status':<8} {'seconds':>8}")
+    for name, (status, seconds, error) in results.items():
+        print(f"{name:<12} {status:<8} {seconds:>8.2f}" + (f"  {error}" if error else ''))
+    counts = {status: sum(1 for result in results.values() if result[0] == status)
+              for status in ('ran', 'cached', 'failed', 'blocked')}
+    print(f"{counts['ran']} ran, {counts['cached']} cache hits, {counts['failed']} failed, "
+          f"{counts['blocked']} blocked")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the history -> model pipeline, skipping up-to-date stages.")
+    parser.add_argument('stages', nargs='*',
+                        help=f"Stages to run (default: all of {', '.join(s.name for s in build_stages())})")
+    parser.add_argument('--force', action='store_true', help="Rerun stages even when their outputs are current")
+    parser.add_argument('--jobs', type=int, default=4, help="Stages run concurrently when independent")
+    parser.add_argument('--state-path', default='data/cache/pipeline_state.json')
+    parser.add_argument('--start-date', default=DEFAULT_PARAMS['start_date'])
+    parser.add_argument('--end-date', default=DEFAULT_PARAMS['end_date'])
+    parser.add_argument('--keywords', nargs='*', default=DEFAULT_PARAMS['keywords'])
+    parser.add_argument('--granularity', choices=['url', 'visit'], default=DEFAULT_PARAMS['granularity'])
+    parser.add_argument('--read-mode', choices=['auto', 'direct', 'backup', 'copy'],
+                        default=DEFAULT_PARAMS['read_mode'])
+    parser.add_argument('--url-cleaner', choices=['fast', 'spacy'], default=DEFAULT_PARAMS['url_cleaner'])
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_PARAMS['dedup_threshold'],
+                        help="Title similarity above which visits to one domain are collapsed")
+    parser.add_argument('--yes', action='store_true', help="Consent to reading browser history without prompting")
+    args = parser.parse_args()
+    if not args.yes and (not args.stages or {'chrome', 'firefox'} & set(args.stages)):
+        print("This pipeline requires explicit user consent to access browser history.")
+        consent = input("Do you consent to extracting your browser history? (yes/no): ").lower()
+        if consent != 'yes':
+            logger.warning("User did not provide consent. Exiting.")
+            print("Consent not provided. Exiting.")
+            sys.exit(1)
+    params = {'start_date': args.start_date, 'end_date': args.end_date, 'keywords': args.keywords,
+              'granularity': args.granularity, 'read_mode': args.read_mode, 'url_cleaner': args.url_cleaner,
+              'dedup_threshold': args.dedup_threshold}
+    results = run_pipeline(args.stages, params, args.force, args.jobs, args.state_path)
+    print_summary(results)
+    sys.exit(1 if any(status == 'failed' for status, _, _ in results.values()) else 0)
@@ -1,7 +1,11 @@
+import argparse
+import glob
+import json
 import sqlite3
 import os
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from shutil import copyfile
 import sys
@@ -11,27 +15,73 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import logger setup
 from utils.logger import setup_logger
+from utils.watermarks import load_watermarks, update_watermark, new_partition_path
+from utils.history_db import open_history_db, keyword_condition, READ_MODES
+from utils.table_io import write_table
+from utils.metrics import timed
 
 # Set up logging
 logger = setup_logger('chrome_history')
 
+# Microseconds between the WebKit epoch (1601-01-01) and the Unix epoch (1970-01-01)
+WEBKIT_EPOCH_OFFSET_US = 11_644_473_600 * 1_000_000
+
+# User data directory of each Chromium-based browser, relative to LOCALAPPDATA on Windows,
+# ~/Library/Application Support on macOS and ~/.config elsewhere
+CHROMIUM_USER_DATA_DIRS = {
+    'chrome': {'nt': r'Google\Chrome\User Data', 'darwin': 'Google/Chrome', 'posix': 'google-chrome'},
+    'brave': {'nt': r'BraveSoftware\Brave-Browser\User Data', 'darwin': 'BraveSoftware/Brave-Browser',
+              'posix': 'BraveSoftware/Brave-Browser'},
+    'chromium': {'nt': r'Chromium\User Data', 'darwin': 'Chromium', 'posix': 'chromium'},
+    'edge': {'nt': r'Microsoft\Edge\User Data', 'darwin': 'Microsoft Edge', 'posix': 'microsoft-edge'},
+    'vivaldi': {'nt': r'Vivaldi\User Data', 'darwin': 'Vivaldi', 'posix': 'vivaldi'},
+}
+
+def chromium_user_data_dir(browser):
+    """Return the browser's user data directory on this OS, or None when its base directory is unknown."""
+    if os.name == 'nt':
+        base, key = os.getenv('LOCALAPPDATA'), 'nt'
+    elif sys.platform == 'darwin':
+        base, key = os.path.join(os.path.expanduser('~'), 'Library', 'Application Support'), 'darwin'
+    else:
+        base, key = os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config'), 'posix'
+    return os.path.join(base, CHROMIUM_USER_DATA_DIRS[browser][key]) if base else None
+
+def chromium_profile_names(user_data_dir):
+    """List profile directories: those in Local State's profile cache, Default and every Profile N."""
+    names = []
+    try:
+        with open(os.path.join(user_data_dir, 'Local State'), encoding='utf-8') as f:
+            names.extend(json.load(f).get('profile', {}).get('info_cache', {}))
+    except (OSError, ValueError):
+        pass
+    names.append('Default')
+    names.extend(os.path.basename(path) for path in glob.glob(os.path.join(user_data_dir, 'Profile *')))
+    return sorted(set(names), key=lambda name: (name != 'Default', len(name), name))
+
+def find_chromium_profiles(browsers=None):
+    """Find every profile with a History database across the Chromium-based browsers.
+
+    Returns dicts with browser, profile (the profile directory name) and path.
+    """
+    profiles = []
+    for browser in browsers or CHROMIUM_USER_DATA_DIRS:
+        user_data_dir = chromium_user_data_dir(browser)
+        if not user_data_dir or not os.path.isdir(user_data_dir):
+            continue
+        for name in chromium_profile_names(user_data_dir):
+            path = os.path.join(user_data_dir, name, 'History')
+            if os.path.exists(path):
+                profiles.append({'browser': browser, 'profile': name, 'path': path})
+    logger.info(f"Found {len(profiles)} Chromium-based browser profiles")
+    return profiles
+
 def get_chromium_history_path():
     """Determine Chrome or Brave history file path based on OS and browser."""
-    base_paths = {
-        'chrome': {
-            'nt': os.path.join(os.getenv('LOCALAPPDATA'), r'Google\Chrome\User Data\Default\History'),
-            'posix': os.path.join(os.path.expanduser('~'), '.config/google-chrome/Default/History')
-        },
-        'brave': {
-            'nt': os.path.join(os.getenv('LOCALAPPDATA'), r'BraveSoftware\Brave-Browser\User Data\Default\History'),
-            'posix': os.path.join(os.path.expanduser('~'), '.config/BraveSoftware/Brave-Browser/Default/History')
-        }
-    }
-    for browser, paths in base_paths.items():
-        path = paths.get(os.name)
-        if path and os.path.exists(path):
-            logger.info(f"Found {browser} history file at {path}")
-            return path, browser
+    for profile in find_chromium_profiles(['chrome', 'brave']):
+        if profile['profile'] == 'Default':
+            logger.info(f"Found {profile['browser']} history file at {profile['path']}")
+            return profile['path'], profile['browser']
     raise FileNotFoundError("No Chrome or Brave history file found")
 
 def copy_history_file(history_path, temp_path='temp_history.db'):
@@ -47,79 +97,153 @@ def copy_history_file(history_path, temp_path='temp_history.db'):
         logger.error("Permission denied accessing history file")
         raise
 
+def webkit_to_datetime(series):
+    """Convert Chrome/Brave timestamps (microseconds since 1601-01-01) to datetimes in one vectorized step.
+
+    The shift stays in int64 microseconds, so precision is kept and dates before 1677
+    (e.g. a zero timestamp) still fit in datetime64[us].
+    """
+    micros = pd.array(series, dtype='Int64') - WEBKIT_EPOCH_OFFSET_US
+    values = micros.to_numpy(dtype='int64', na_value=np.iinfo(np.int64).min)
+    return pd.Series(values.view('datetime64[us]'), index=series.index)
+
+@timed('extract_chromium_history', rows=len)
 def extract_chromium_history(temp_path, output_path='data/raw/user1_history.csv', 
-                           start_date=None, end_date=None, keywords=None):
-    """Extract history from Chrome/Brave SQLite database with filters and save to CSV."""
+                           start_date=None, end_date=None, keywords=None,
+                           incremental=False, profile_key=None, state_path='data/raw/watermarks.json',
+                           read_mode='auto', granularity='url', tags=None):
+    """Extract history from Chrome/Brave SQLite database with filters and save to CSV.
+
+    An output_path ending in .parquet or .arrow writes that columnar format instead.
+
+    granularity='url' writes one row per URL with visit_count and first/last visit
+    times aggregated in SQL over the matching visits; granularity='visit' writes one
+    row per visit with its visit_time. Keywords are matched as substrings of the title
+    or url (LIKE '%keyword%') in the same pass as the date filters. tags maps column names
+    to constant values added to every row, such as the browser and profile the history came from.
+
+    With incremental=True only visits newer than the profile's stored watermark are
+    read, and they are appended as a new partition under data/raw/<name>/ instead of
+    overwriting output_path. The default read_mode='auto' reads the browser's database
+    in place and copies it only when it is locked; pass read_mode='temp' only for a copy
+    made by copy_history_file, which is then deleted. See open_history_db for the modes.
+    """
+    if granularity not in ('url', 'visit'):
+        raise ValueError(f"Unknown granularity {granularity!r}, expected 'url' or 'visit'")
+    conn = None
+    cleanup = None
     try:
-        conn = sqlite3.connect(temp_path)
+        conn, cleanup = open_history_db(temp_path, read_mode)
         cursor = conn.cursor()
-        query = """
-        SELECT urls.url, urls.title, urls.last_visit_time
-        FROM urls
-        JOIN visits ON urls.id = visits.url
-        WHERE 1=1
-        """
+        conditions = []
         params = []
+        watermarks = load_watermarks(state_path) if incremental else {}
+        profile_key = profile_key or temp_path
+        last_visit_id = watermarks.get(profile_key, {}).get('visit_id')
+        if last_visit_id is not None:
+            conditions.append("visits.id > ?")
+            params.append(last_visit_id)
         if start_date:
             start_timestamp = int((start_date - datetime(1601, 1, 1)).total_seconds() * 1_000_000)
-            query += " AND urls.last_visit_time >= ?"
+            conditions.append("visits.visit_time >= ?")
             params.append(start_timestamp)
         if end_date:
             end_timestamp = int((end_date - datetime(1601, 1, 1)).total_seconds() * 1_000_000)
-            query += " AND urls.last_visit_time <= ?"
+            conditions.append("visits.visit_time <= ?")
             params.append(end_timestamp)
         if keywords:
-            keyword_conditions = " OR ".join(["urls.url LIKE ? OR urls.title LIKE ?" for _ in keywords])
-            query += f" AND ({keyword_conditions})"
-            for keyword in keywords:
-                params.extend([f"%{keyword}%", f"%{keyword}%"])
-        query += " ORDER BY urls.last_visit_time DESC"
+            # A temporary FTS index would be rebuilt from a full scan on every export, which costs
+            # more than the single LIKE pass it saves, so keywords are matched with LIKE only
+            condition, keyword_params = keyword_condition(keywords, ['urls.title', 'urls.url'])
+            conditions.append(condition)
+            params.extend(keyword_params)
+        where = " AND ".join(conditions) or "1=1"
+
+        if granularity == 'url':
+            query = f"""
+            SELECT urls.url, urls.title, COUNT(visits.id) AS visit_count,
+                   MIN(visits.visit_time) AS first_visit_time, MAX(visits.visit_time) AS last_visit_time,
+                   MAX(visits.id) AS visit_id
+            FROM urls
+            JOIN visits ON urls.id = visits.url
+            WHERE {where}
+            GROUP BY urls.id
+            ORDER BY last_visit_time DESC
+            """
+            columns = ['url', 'title', 'visit_count', 'first_visit_time', 'last_visit_time', 'visit_id']
+            time_columns = ['first_visit_time', 'last_visit_time']
+        else:
+            query = f"""
+            SELECT urls.url, urls.title, visits.visit_time, visits.id
+            FROM urls
+            JOIN visits ON urls.id = visits.url
+            WHERE {where}
+            ORDER BY visits.visit_time DESC
+            """
+            columns = ['url', 'title', 'visit_time', 'visit_id']
+            time_columns = ['visit_time']
         cursor.execute(query, params)
         history_data = cursor.fetchall()
-        columns = ['url', 'title', 'last_visit_time']
         df = pd.DataFrame(history_data, columns=columns)
+        max_visit_id = int(df['visit_id'].max()) if len(df) else last_visit_id
+        max_visit_time = int(df[time_columns[-1]].max()) if len(df) else None
+        df = df.drop(columns=['visit_id'])
 
-        # Convert Chrome/Brave timestamp (microseconds since 1601-01-01) to datetime
-        EPOCH = datetime(1601, 1, 1)
-        df['last_visit_time'] = df['last_visit_time'].apply(
-            lambda x: EPOCH + timedelta(microseconds=x) if pd.notna(x) else pd.NaT
-        )
+        for column in time_columns:
+            df[column] = webkit_to_datetime(df[column])
+        for column, value in (tags or {}).items():
+            df[column] = value
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        df.to_csv(output_path, index=False)
+        if incremental:
+            if len(df) == 0:
+                logger.info(f"No new visits since visit id {last_visit_id} for {profile_key}")
+                return df
+            output_path = new_partition_path(output_path)
+        write_table(df, output_path)
         logger.info(f"Saved history to {output_path} with {len(df)} records")
 
+        if incremental:
+            update_watermark(profile_key, {'visit_id': max_visit_id, 'last_visit_time': max_visit_time}, state_path)
+            logger.info(f"Advanced watermark for {profile_key} to visit id {max_visit_id}")
+
         return df
     except sqlite3.Error as e:
         logger.error(f"SQLite error: {e}")
         raise
     finally:
-        conn.close()
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            logger.info(f"Removed temporary file {temp_path}")
+        if conn is not None:
+            conn.close()
+        if cleanup is not None:
+            cleanup()
 
-def main(start_date=None, end_date=None, keywords=None):
+def main(start_date=None, end_date=None, keywords=None, incremental=False, read_mode='auto', granularity='url'):
     """Main function to orchestrate history scraping with optional filters."""
     try:
         logger.info("Please ensure Chrome or Brave is closed before running.")
         history_path, browser = get_chromium_history_path()
-        temp_path = f'temp_{browser}_history.db'
-        temp_db = copy_history_file(history_path, temp_path)
-        extract_chromium_history(temp_path, 'data/raw/user1_history.csv', start_date, end_date, keywords)
+        extract_chromium_history(history_path, 'data/raw/user1_history.csv', start_date, end_date, keywords,
+                                 incremental=incremental, profile_key=f"{browser}:{history_path}",
+                                 read_mode=read_mode, granularity=granularity)
         logger.info(f"{browser.capitalize()} history extraction completed")
     except Exception as e:
         logger.error(f"Failed to extract history: {e}")
         raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract Chrome/Brave history to CSV.")
+    parser.add_argument('--incremental', action='store_true', help="Only fetch visits newer than the last run")
+    parser.add_argument('--read-mode', choices=[m for m in READ_MODES if m != 'temp'], default='auto',
+                        help="How to open the history database (default: in place, copy if locked)")
+    parser.add_argument('--granularity', choices=['url', 'visit'], default='url',
+                        help="One row per URL with aggregated visits, or one row per visit")
+    args = parser.parse_args()
     print("This script requires explicit user consent to access browser history.")
     consent = input("Do you consent to extracting your Chrome/Brave history? (yes/no): ").lower()
     if consent == 'yes':
         start_date = datetime(2025, 1, 1)  # Example: from Jan 1, 2025
         end_date = datetime(2025, 7, 19)   # Example: up to July 19, 2025
         keywords = ['politics', 'news']     # Example: filter for politics/news
-        main(start_date, end_date, keywords)
+        main(start_date, end_date, keywords, args.incremental, args.read_mode, args.granularity)
     else:
         logger.warning("User did not provide consent. Exiting.")
         print("Consent not provided. Exiting.")
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Adjust sys.path to include src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logger import setup_logger
+from utils.history_db import READ_MODES
+from chrome_history import CHROMIUM_USER_DATA_DIRS, extract_chromium_history, find_chromium_profiles
+from firefox_history import extract_firefox_history, find_firefox_profiles
+
+# Set up logging
+logger = setup_logger('extract_profiles')
+
+BROWSERS = list(CHROMIUM_USER_DATA_DIRS) + ['firefox']
+MANIFEST_NAME = 'manifest.json'
+
+def discover_profiles(browsers=None):
+    """List every browser profile with a history database, optionally only for some browsers."""
+    browsers = browsers or BROWSERS
+    profiles = find_chromium_profiles([browser for browser in browsers if browser in CHROMIUM_USER_DATA_DIRS])
+    if 'firefox' in browsers:
+        profiles.extend(find_firefox_profiles())
+    return profiles
+
+def profile_slug(profile):
+    """Turn a browser and profile name into a file-name-safe id such as chrome_profile-2."""
+    name = re.sub(r'[^0-9a-z]+', '-', profile['profile'].lower()).strip('-') or 'default'
+    return f"{profile['browser']}_{name}"
+
+def profile_slugs(profiles):
+    """Return one unique slug per profile.
+
+    Profiles whose slugs collide, such as Firefox profiles "Work" and "work", get a short
+    hash of their path appended, so they never share an output file or a user_id.
+    """
+    slugs = [profile_slug(profile) for profile in profiles]
+    counts = Counter(slugs)
+    unique = []
+    for slug, profile in zip(slugs, profiles):
+        if counts[slug] > 1:
+            slug = f"{slug}-{hashlib.sha1(profile['path'].encode('utf-8')).hexdigest()[:8]}"
+            logger.warning(f"Profile {profile['profile']} shares its name with another profile; using {slug}")
+        unique.append(slug)
+    return unique
+
+def profile_output_path(output_dir, slug, extension='.csv'):
+    """Return the table for a profile slug in the dataset; preprocess derives user_id from its name."""
+    return os.path.join(output_dir, f"{slug}_history{extension}")
+
+def extract_profile(profile, output_path, read_mode='auto', incremental=False,
+                    state_path='data/raw/watermarks.json', **filters):
+    """Extract one profile with its browser's extractor, tagging rows with browser and profile.
+
+    Every browser gets the same granularity and date/keyword filters, so all tables share
+    one schema. Returns a manifest entry with the filters applied, the row count and wall
+    time; a failure is recorded in the entry instead of raised, so one locked or corrupt
+    profile does not stop the rest.
+    """
+    entry = {'browser': profile['browser'], 'profile': profile['profile'], 'source': profile['path'],
+             'output': output_path,
+             'filters': {name: value.isoformat() if isinstance(value, datetime) else value
+                         for name, value in filters.items()}}
+    tags = {'browser': profile['browser'], 'profile': profile['profile']}
+    profile_key = f"{profile['browser']}:{profile['path']}"
+    start = time.perf_counter()
+    try:
+        if profile['browser'] == 'firefox':
+            df = extract_firefox_history(profile['path'], output_path, incremental=incremental,
+                                         profile_key=profile_key, state_path=state_path, read_mode=read_mode,
+                                         tags=tags, **filters)
+        else:
+            df = extract_chromium_history(profile['path'], output_path, incremental=incremental,
+                                          profile_key=profile_key, state_path=state_path, read_mode=read_mode,
+                                          tags=tags, **filters)
+        entry.update(status='ok', rows=len(df))
+    except Exception as e:
+        logger.error(f"Extraction of {profile['browser']} profile {profile['profile']} failed: {e}")
+        entry.update(status='error', rows=0, error=str(e))
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+def extract_all_profiles(output_dir='data/raw/profiles', browsers=None, max_workers=None, read_mode='auto',
+                         incremental=False, state_path='data/raw/watermarks.json', extension='.csv',
+                         start_date=None, end_date=None, keywords=None, granularity='url'):
+    """Extract every discovered profile concurrently into one dataset directory.
+
+    Each profile gets its own table (or, with incremental=True, its own partition
+    directory) in output_dir, so preprocess and batch_scorer can take output_dir as a
+    single input. SQLite releases the GIL while it reads, so profiles overlap in a thread
+    pool. Per-profile filters, rows, timings and errors are written to output_dir/manifest.json.
+    """
+    profiles = discover_profiles(browsers)
+    if not profiles:
+        raise FileNotFoundError("No browser profiles with history found")
+    filters = {'start_date': start_date, 'end_date': end_date, 'keywords': keywords, 'granularity': granularity}
+    max_workers = max_workers or min(8, len(profiles))
+    logger.info(f"Extracting {len(profiles)} profiles with {max_workers} threads into {output_dir}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(extract_profile, profile, profile_output_path(output_dir, slug, extension),
+                                   read_mode, incremental, state_path, **filters)
+                   for profile, slug in zip(profiles, profile_slugs(profiles))]
+        entries = [future.result() for future in as_completed(futures)]
+    wall_seconds = time.perf_counter() - start
+    entries.sort(key=lambda entry: (entry['browser'], entry['profile']))
+
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': round(wall_seconds, 3),
+        'profile_seconds': round(sum(entry['seconds'] for entry in entries), 3),
+        'max_workers': max_workers,
+        'profiles': entries,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    failed = [entry for entry in entries if entry['status'] != 'ok']
+    logger.info(f"Extracted {sum(entry['rows'] for entry in entries)} rows from {len(entries) - len(failed)} "
+                f"profiles in {wall_seconds:.2f}s ({manifest['profile_seconds']:.2f}s of per-profile work)"
+                + (f"; {len(failed)} failed" if failed else ""))
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the history of every browser profile concurrently.")
+    parser.add_argument('--browsers', nargs='+', choices=BROWSERS, help="Only these browsers (default: all)")
+    parser.add_argument('--output-dir', default='data/raw/profiles')
+    parser.add_argument('--jobs', type=int, help="Extraction threads (default: one per profile, at most 8)")
+    parser.add_argument('--incremental', action='store_true', help="Only fetch visits newer than the last run")
+    parser.add_argument('--read-mode', choices=[m for m in READ_MODES if m != 'temp'], default='auto')
+    parser.add_argument('--granularity', choices=['url', 'visit'], default='url')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'arrow'], default='csv')
+    parser.add_argument('--list', action='store_true', help="Only list the discovered profiles")
+    args = parser.parse_args()
+    if args.list:
+        for profile in discover_profiles(args.browsers):
+            print(f"{profile['browser']:<10} {profile['profile']:<24} {profile['path']}")
+        sys.exit(0)
+    print("This script requires explicit user consent to access browser history.")
+    consent = input("Do you consent to extracting the history of every browser profile? (yes/no): ").lower()
+    if consent == 'yes':
+        extract_all_profiles(args.output_dir, args.browsers, args.jobs, args.read_mode, args.incremental,
+                             extension=f".{args.format}", granularity=args.granularity)
+    else:
+        logger.warning("User did not provide consent. Exiting.")
+        print("Consent not provided. Exiting.")
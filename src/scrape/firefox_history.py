@@ -1,9 +1,21 @@
+import argparse
+import configparser
 import sqlite3
 import os
 import pandas as pd
 import logging
+import sys
+from datetime import datetime
 from shutil import copyfile
 
+# Adjust sys.path to include src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.table_io import write_table
+from utils.metrics import timed
+from utils.watermarks import load_watermarks, update_watermark, new_partition_path
+from utils.history_db import open_history_db, keyword_condition, READ_MODES
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -12,23 +24,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def firefox_profile_roots():
+    """Return the directories that may hold a Firefox profiles.ini on this OS."""
+    home = os.path.expanduser('~')
+    if os.name == 'nt':
+        return [os.path.join(os.getenv('APPDATA'), 'Mozilla', 'Firefox')] if os.getenv('APPDATA') else []
+    if sys.platform == 'darwin':
+        return [os.path.join(home, 'Library', 'Application Support', 'Firefox')]
+    # Snap and Flatpak builds keep their profiles under their own sandbox directories
+    return [os.path.join(home, '.mozilla', 'firefox'),
+            os.path.join(home, 'snap', 'firefox', 'common', '.mozilla', 'firefox'),
+            os.path.join(home, '.var', 'app', 'org.mozilla.firefox', '.mozilla', 'firefox')]
+
+def read_profiles_ini(root):
+    """Yield (name, profile directory, is_default) for every [Profile*] section of root/profiles.ini."""
+    parser = configparser.RawConfigParser()
+    parser.read(os.path.join(root, 'profiles.ini'), encoding='utf-8')
+    for section in parser.sections():
+        if not section.startswith('Profile') or not parser.has_option(section, 'Path'):
+            continue
+        path = parser.get(section, 'Path')
+        if parser.get(section, 'IsRelative', fallback='1') == '1':
+            path = os.path.join(root, path)
+        yield parser.get(section, 'Name', fallback=section), os.path.normpath(path), \
+            parser.get(section, 'Default', fallback='0') == '1'
+
+def find_firefox_profiles():
+    """Find every Firefox profile listed in profiles.ini that has a places.sqlite, default profile first.
+
+    Returns dicts with browser, profile (the profile name from profiles.ini) and path.
+    """
+    profiles = []
+    for root in firefox_profile_roots():
+        if not os.path.exists(os.path.join(root, 'profiles.ini')):
+            continue
+        for name, profile_dir, is_default in read_profiles_ini(root):
+            path = os.path.join(profile_dir, 'places.sqlite')
+            if os.path.exists(path):
+                profiles.append({'browser': 'firefox', 'profile': name, 'path': path, 'default': is_default})
+    profiles.sort(key=lambda profile: not profile['default'])
+    logger.info(f"Found {len(profiles)} Firefox profiles")
+    return profiles
+
 def get_firefox_history_path():
     """Determine Firefox history file path by reading profiles.ini."""
-    profile_dir = os.path.join(os.path.expanduser('~'), '.mozilla/firefox')
-    profiles_ini = os.path.join(profile_dir, 'profiles.ini')
-    try:
-        with open(profiles_ini, 'r') as f:
-            for line in f:
-                if 'Path=' in line:
-                    profile = line.strip().split('=')[1]
-                    history_path = os.path.join(profile_dir, profile, 'places.sqlite')
-                    if os.path.exists(history_path):
-                        logger.info(f"Found Firefox history file at {history_path}")
-                        return history_path
+    profiles = find_firefox_profiles()
+    if not profiles:
+        logger.error(f"No Firefox profile with history found under {', '.join(firefox_profile_roots())}")
         raise FileNotFoundError("Firefox profile not found")
-    except FileNotFoundError:
-        logger.error(f"profiles.ini not found at {profiles_ini}")
-        raise
+    logger.info(f"Found Firefox history file at {profiles[0]['path']}")
+    return profiles[0]['path']
 
 def copy_history_file(history_path, temp_path='temp_firefox_history.db'):
     """Copy Firefox history file to avoid locking issues."""
@@ -43,50 +88,120 @@ def copy_history_file(history_path, temp_path='temp_firefox_history.db'):
         logger.error("Permission denied accessing Firefox history file")
         raise
 
-def extract_firefox_history(temp_path, output_path='data/raw/user2_history.csv'):
-    """Extract history from Firefox SQLite database and save to CSV."""
+@timed('extract_firefox_history', rows=len)
+def extract_firefox_history(temp_path, output_path='data/raw/user2_history.csv',
+                            incremental=False, profile_key=None, state_path='data/raw/watermarks.json',
+                            read_mode='auto', tags=None, start_date=None, end_date=None, keywords=None,
+                            granularity='url'):
+    """Extract history from Firefox SQLite database and save to CSV.
+
+    An output_path ending in .parquet or .arrow writes that columnar format instead.
+
+    Rows match extract_chromium_history: granularity='url' writes one row per place with
+    visit_count and first/last visit times aggregated over the matching visits in
+    moz_historyvisits, granularity='visit' one row per visit with its visit_time. Dates
+    filter visits and keywords match as LIKE '%keyword%' substrings of the title or url.
+
+    With incremental=True only visits after the profile's stored watermark are read,
+    and they are appended as a new partition under data/raw/<name>/. The default
+    read_mode='auto' reads places.sqlite (and its WAL) in place and copies it only when it
+    is locked; pass read_mode='temp' only for a copy made by copy_history_file, which is
+    then deleted. tags maps column names to constant values added to every row.
+    """
+    if granularity not in ('url', 'visit'):
+        raise ValueError(f"Unknown granularity {granularity!r}, expected 'url' or 'visit'")
+    conn = None
+    cleanup = None
     try:
-        conn = sqlite3.connect(temp_path)
+        conn, cleanup = open_history_db(temp_path, read_mode)
         cursor = conn.cursor()
+        conditions = []
+        params = []
+        watermarks = load_watermarks(state_path) if incremental else {}
+        profile_key = profile_key or temp_path
+        last_visit_id = watermarks.get(profile_key, {}).get('visit_id')
+        if last_visit_id is not None:
+            conditions.append("moz_historyvisits.id > ?")
+            params.append(last_visit_id)
+        # Firefox timestamps are microseconds since 1970-01-01
+        if start_date:
+            conditions.append("moz_historyvisits.visit_date >= ?")
+            params.append(int((start_date - datetime(1970, 1, 1)).total_seconds() * 1_000_000))
+        if end_date:
+            conditions.append("moz_historyvisits.visit_date <= ?")
+            params.append(int((end_date - datetime(1970, 1, 1)).total_seconds() * 1_000_000))
+        if keywords:
+            condition, keyword_params = keyword_condition(keywords, ['moz_places.title', 'moz_places.url'])
+            conditions.append(condition)
+            params.extend(keyword_params)
+        where = " AND ".join(conditions) or "1=1"
 
-        query = """
-        SELECT moz_places.url, moz_places.title, moz_places.last_visit_date
-        FROM moz_places
-        WHERE moz_places.last_visit_date IS NOT NULL
-        ORDER BY moz_places.last_visit_date DESC
-        """
-        cursor.execute(query)
+        if granularity == 'url':
+            query = f"""
+            SELECT moz_places.url, moz_places.title, COUNT(moz_historyvisits.id) AS visit_count,
+                   MIN(moz_historyvisits.visit_date) AS first_visit_time,
+                   MAX(moz_historyvisits.visit_date) AS last_visit_time, MAX(moz_historyvisits.id) AS visit_id
+            FROM moz_places
+            JOIN moz_historyvisits ON moz_places.id = moz_historyvisits.place_id
+            WHERE {where}
+            GROUP BY moz_places.id
+            ORDER BY last_visit_time DESC
+            """
+            columns = ['url', 'title', 'visit_count', 'first_visit_time', 'last_visit_time', 'visit_id']
+            time_columns = ['first_visit_time', 'last_visit_time']
+        else:
+            query = f"""
+            SELECT moz_places.url, moz_places.title, moz_historyvisits.visit_date, moz_historyvisits.id
+            FROM moz_places
+            JOIN moz_historyvisits ON moz_places.id = moz_historyvisits.place_id
+            WHERE {where}
+            ORDER BY moz_historyvisits.visit_date DESC
+            """
+            columns = ['url', 'title', 'visit_time', 'visit_id']
+            time_columns = ['visit_time']
+        cursor.execute(query, params)
         history_data = cursor.fetchall()
-
-        columns = ['url', 'title', 'last_visit_time']
         df = pd.DataFrame(history_data, columns=columns)
+        max_visit_id = int(df['visit_id'].max()) if len(df) else last_visit_id
+        max_visit_time = int(df[time_columns[-1]].max()) if len(df) else None
+        df = df.drop(columns=['visit_id'])
 
-        # Convert Firefox timestamp (microseconds since 1970-01-01) to datetime
-        df['last_visit_time'] = pd.to_datetime(df['last_visit_time'], unit='us')
+        for column in time_columns:
+            df[column] = pd.to_datetime(df[column], unit='us')
+        for column, value in (tags or {}).items():
+            df[column] = value
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        df.to_csv(output_path, index=False)
+        if incremental:
+            if len(df) == 0:
+                logger.info(f"No new visits since visit id {last_visit_id} for {profile_key}")
+                return df
+            output_path = new_partition_path(output_path)
+        write_table(df, output_path)
         logger.info(f"Saved history to {output_path} with {len(df)} records")
 
+        if incremental:
+            update_watermark(profile_key, {'visit_id': max_visit_id, 'last_visit_time': max_visit_time}, state_path)
+            logger.info(f"Advanced watermark for {profile_key} to visit id {max_visit_id}")
+
         return df
 
     except sqlite3.Error as e:
         logger.error(f"SQLite error: {e}")
         raise
     finally:
-        conn.close()
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            logger.info(f"Removed temporary file {temp_path}")
+        if conn is not None:
+            conn.close()
+        if cleanup is not None:
+            cleanup()
 
-def main():
+def main(incremental=False, read_mode='auto', granularity='url'):
     """Main function to orchestrate history scraping."""
     try:
         logger.info("Please ensure Firefox is closed before running.")
         history_path = get_firefox_history_path()
-        temp_path = 'temp_firefox_history.db'
-        temp_db = copy_history_file(history_path, temp_path)
-        extract_firefox_history(temp_db, 'data/raw/user2_history.csv')
+        extract_firefox_history(history_path, 'data/raw/user2_history.csv',
+                                incremental=incremental, profile_key=f"firefox:{history_path}",
+                                read_mode=read_mode, granularity=granularity)
         logger.info("Firefox history extraction completed")
 
     except Exception as e:
@@ -94,10 +209,17 @@ def main():
         raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract Firefox history to CSV.")
+    parser.add_argument('--incremental', action='store_true', help="Only fetch visits newer than the last run")
+    parser.add_argument('--read-mode', choices=[m for m in READ_MODES if m != 'temp'], default='auto',
+                        help="How to open places.sqlite (default: in place, copy if locked)")
+    parser.add_argument('--granularity', choices=['url', 'visit'], default='url',
+                        help="One row per URL with aggregated visits, or one row per visit")
+    args = parser.parse_args()
     print("This script requires explicit user consent to access browser history.")
     consent = input("Do you consent to extracting your Firefox history? (yes/no): ").lower()
     if consent == 'yes':
-        main()
+        main(args.incremental, args.read_mode, args.granularity)
     else:
         logger.warning("User did not provide consent. Exiting.")
         print("Consent not provided. Exiting.")
\ No newline at end of file
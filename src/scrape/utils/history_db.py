@@ -0,0 +1,136 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from urllib.request import pathname2url
+
+from utils.logger import setup_logger
+
+# Set up logging
+logger = setup_logger('history_db')
+
+READ_MODES = ('auto', 'direct', 'backup', 'copy', 'temp')
+SIDECAR_SUFFIXES = ('-wal', '-journal')
+
+def keyword_condition(keywords, columns):
+    """Return an SQL condition matching any keyword as a LIKE '%keyword%' substring of any column, and its params."""
+    condition = " OR ".join(f"{column} LIKE ?" for _ in keywords for column in columns)
+    return f"({condition})", [f"%{keyword}%" for keyword in keywords for _ in columns]
+
+def has_sidecar(history_path):
+    """Return True when a -wal or -journal file sits next to the database, so it may be in use or mid-write."""
+    return any(os.path.exists(f"{history_path}{suffix}") for suffix in SIDECAR_SUFFIXES)
+
+def is_locked_error(error):
+    """Whether an OperationalError means another process holds a lock on the database."""
+    name = getattr(error, 'sqlite_errorname', '')
+    return name.startswith(('SQLITE_BUSY', 'SQLITE_LOCKED')) or 'locked' in str(error)
+
+def read_only_uri(history_path, immutable):
+    """Build a read-only SQLite URI; immutable skips all locking and WAL/journal lookups."""
+    uri = f"file:{pathname2url(os.path.abspath(history_path))}?mode=ro"
+    return f"{uri}&immutable=1" if immutable else uri
+
+def open_checked(uri):
+    """Connect to a SQLite URI and touch the schema so lock and open errors surface here rather than mid-query."""
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+def connect_direct(history_path):
+    """Open the browser database in place without copying it.
+
+    A plain mode=ro connection takes SQLite's shared lock, so a live WAL is read
+    consistently and a database the browser holds locked (Chrome keeps History in
+    rollback-journal mode) fails with SQLITE_BUSY instead of returning half-written
+    pages. immutable=1 skips locking, so it is only tried when mode=ro fails for another
+    reason, such as a read-only directory, and no -wal or -journal file is present.
+    """
+    try:
+        conn = open_checked(read_only_uri(history_path, immutable=False))
+        mode = 'read-only'
+    except sqlite3.OperationalError as e:
+        if is_locked_error(e) or has_sidecar(history_path):
+            raise
+        logger.warning(f"Could not open {history_path} read-only ({e}); retrying as immutable")
+        conn = open_checked(read_only_uri(history_path, immutable=True))
+        mode = 'immutable'
+    logger.info(f"Opened {history_path} in place ({mode})")
+    return conn
+
+def copy_with_sidecars(history_path, temp_dir):
+    """Copy the database and its WAL/journal into temp_dir so the copy replays uncheckpointed pages."""
+    temp_path = os.path.join(temp_dir, os.path.basename(history_path))
+    shutil.copyfile(history_path, temp_path)
+    for suffix in SIDECAR_SUFFIXES:
+        if os.path.exists(f"{history_path}{suffix}"):
+            shutil.copyfile(f"{history_path}{suffix}", f"{temp_path}{suffix}")
+    logger.info(f"Copied history file to {temp_path}")
+    return temp_path
+
+def backup_to(history_path, temp_dir, pages=4096):
+    """Snapshot the database with the SQLite online backup API, logging page-level progress."""
+    temp_path = os.path.join(temp_dir, os.path.basename(history_path))
+    source = sqlite3.connect(read_only_uri(history_path, immutable=False), uri=True)
+    target = sqlite3.connect(temp_path)
+
+    def progress(status, remaining, total):
+        logger.info(f"Backed up {total - remaining}/{total} pages of {history_path}")
+
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    finally:
+        source.close()
+        target.close()
+    return temp_path
+
+def open_history_db(history_path, read_mode='auto'):
+    """Open a browser history database and return (connection, cleanup).
+
+    read_mode is one of:
+      'auto'   - read in place, falling back to a full copy if the database is locked (SQLITE_BUSY)
+      'direct' - read in place only
+      'backup' - snapshot through the SQLite backup API into a temporary file
+      'copy'   - copy the database and its WAL/journal into a temporary directory
+      'temp'   - history_path is a disposable copy from copy_history_file; it is deleted on cleanup
+    Call cleanup() after closing the connection.
+    """
+    if read_mode not in READ_MODES:
+        raise ValueError(f"Unknown read mode {read_mode!r}, expected one of {READ_MODES}")
+    if not os.path.exists(history_path):
+        raise FileNotFoundError(f"History file not found at {history_path}")
+
+    if read_mode == 'temp':
+        def remove_temp():
+            if os.path.exists(history_path):
+                os.remove(history_path)
+                logger.info(f"Removed temporary file {history_path}")
+        return sqlite3.connect(history_path), remove_temp
+
+    if read_mode in ('auto', 'direct'):
+        try:
+            return connect_direct(history_path), lambda: None
+        except sqlite3.OperationalError as e:
+            if read_mode == 'direct':
+                raise
+            logger.warning(f"Could not read {history_path} in place ({e}); falling back to a copy")
+
+    temp_dir = tempfile.mkdtemp(prefix='history_')
+
+    def remove_temp_dir():
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        logger.info(f"Removed temporary directory {temp_dir}")
+
+    try:
+        if read_mode == 'backup':
+            temp_path = backup_to(history_path, temp_dir)
+        else:
+            temp_path = copy_with_sidecars(history_path, temp_dir)
+        return sqlite3.connect(temp_path), remove_temp_dir
+    except Exception:
+        remove_temp_dir()
+        raise
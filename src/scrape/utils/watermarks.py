@@ -0,0 +1,40 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Profiles extracted concurrently share one state file, so read-modify-write cycles are serialized
+_lock = threading.Lock()
+
+def load_watermarks(state_path='data/raw/watermarks.json'):
+    """Load the last-seen visit markers for every profile."""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+def save_watermarks(watermarks, state_path='data/raw/watermarks.json'):
+    """Persist the visit markers atomically so a crash never leaves a half-written file."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def update_watermark(profile_key, watermark, state_path='data/raw/watermarks.json'):
+    """Store one profile's marker without losing markers saved meanwhile by other threads."""
+    with _lock:
+        watermarks = load_watermarks(state_path)
+        watermarks[profile_key] = watermark
+        save_watermarks(watermarks, state_path)
+
+def partition_dir(output_path):
+    """Map an output CSV such as data/raw/user1_history.csv to its partition directory."""
+    return os.path.splitext(output_path)[0]
+
+def new_partition_path(output_path):
+    """Return a fresh, time-ordered partition file under the output's partition directory."""
+    directory = partition_dir(output_path)
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(output_path)[1] or '.csv'
+    return os.path.join(directory, f"part-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}{extension}")
@@ -0,0 +1,187 @@
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include src directory for the shared table readers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scorer import LEANINGS, LeaningScorer
+from utils.logger import setup_logger
+from utils.table_io import FORMATS, iter_table, table_columns, write_table
+from preprocess import source_user_id
+
+# Set up logging
+logger = setup_logger('serve_batch')
+
+# Columns read from each history file; anything else is skipped to keep chunks small
+INPUT_COLUMNS = ['title', 'url', 'cleaned_title', 'cleaned_url', 'domain', 'user_id', 'visit_count']
+# Visit timestamps in order of preference: per-visit rows, then per-URL rows
+TIME_COLUMNS = ['visit_time', 'last_visit_time']
+
+_scorer = None
+
+def init_worker(model_path, vectorizer_path, bundle_dir, clean):
+    """Load the scorer once per worker process."""
+    global _scorer
+    _scorer = LeaningScorer(model_path, vectorizer_path, clean=clean, bundle_dir=bundle_dir)
+
+def expand_inputs(inputs):
+    """Expand files, glob patterns and directories into a sorted list of history tables."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, '**', '*'), recursive=True)
+            paths.extend(path for path in matches if os.path.isfile(path) and os.path.splitext(path)[1] in FORMATS)
+        elif glob.has_magic(item):
+            paths.extend(glob.glob(item))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+def new_profile():
+    """Return empty running totals for one user."""
+    return {'rows': 0, 'visits': 0.0, 'weighted_right': 0.0, 'weighted_left': 0.0, 'right_rows': 0,
+            'neutral_rows': 0, 'windows': {}}
+
+def accumulate(profiles, chunk, labels, probabilities, window):
+    """Add one scored chunk (labels and {leaning: probabilities} from LeaningScorer.score) to the running totals."""
+    visits = chunk['visit_count'].fillna(1).to_numpy(dtype=np.float64) if 'visit_count' in chunk else 1.0
+    right = probabilities.get('right', np.zeros(len(chunk)))
+    left = probabilities.get('left', np.zeros(len(chunk)))
+    leanings = np.array([LEANINGS.get(int(label)) for label in labels], dtype=object)
+    frame = pd.DataFrame({'user_id': chunk['user_id'].astype(str).to_numpy(), 'visits': visits,
+                          'weighted': right * visits, 'weighted_left': left * visits,
+                          'right': leanings == 'right', 'neutral': leanings == 'neutral'})
+    time_column = next((c for c in TIME_COLUMNS if c in chunk.columns), None)
+    if time_column:
+        times = pd.to_datetime(chunk[time_column], errors='coerce').to_numpy()
+        periods = pd.PeriodIndex(pd.DatetimeIndex(times), freq=window)
+        frame['window'] = np.where(periods.isna(), -1, periods.asi8)
+    for user_id, group in frame.groupby('user_id', sort=False):
+        profile = profiles.setdefault(user_id, new_profile())
+        profile['rows'] += len(group)
+        profile['visits'] += group['visits'].sum()
+        profile['weighted_right'] += group['weighted'].sum()
+        profile['weighted_left'] += group['weighted_left'].sum()
+        profile['right_rows'] += int(group['right'].sum())
+        profile['neutral_rows'] += int(group['neutral'].sum())
+        if time_column:
+            dated = group[group['window'] >= 0]
+            for ordinal, totals in dated.groupby('window')[['visits', 'weighted']].sum().iterrows():
+                window_totals = profile['windows'].setdefault(int(ordinal), [0.0, 0.0])
+                window_totals[0] += totals['visits']
+                window_totals[1] += totals['weighted']
+
+def merge_profiles(profiles, other):
+    """Fold the running totals of one file into the overall totals."""
+    for user_id, totals in other.items():
+        profile = profiles.setdefault(user_id, new_profile())
+        for key in ('rows', 'visits', 'weighted_right', 'weighted_left', 'right_rows', 'neutral_rows'):
+            profile[key] += totals[key]
+        for ordinal, (visits, weighted) in totals['windows'].items():
+            window_totals = profile['windows'].setdefault(ordinal, [0.0, 0.0])
+            window_totals[0] += visits
+            window_totals[1] += weighted
+
+def score_file(path, window='W', chunksize=50_000):
+    """Score one history table chunk by chunk and return per-user running totals."""
+    available = table_columns(path)
+    columns = [c for c in INPUT_COLUMNS + TIME_COLUMNS if c in available]
+    profiles = {}
+    for chunk in iter_table(path, columns=columns, chunksize=chunksize):
+        if 'user_id' not in chunk.columns:
+            chunk['user_id'] = source_user_id(path)
+        labels, probabilities = _scorer.score(_scorer.frame_features(chunk))
+        accumulate(profiles, chunk, labels, probabilities, window)
+    return profiles
+
+def summarize_profile(user_id, profile, window):
+    """Turn running totals into one summary row with a visit-weighted leaning and its trend.
+
+    The leaning is the most probable of left, right and, for models with a neutral class,
+    neutral, averaged over visits; for a two-class model this is probability_right >= 0.5.
+    A user without visits has no evidence either way, so their leaning is neutral and
+    probability_right is NaN.
+    """
+    mean = profile['weighted_right'] / profile['visits'] if profile['visits'] else float('nan')
+    mean_left = profile['weighted_left'] / profile['visits'] if profile['visits'] else float('nan')
+    means = {'right': mean, 'left': mean_left, 'neutral': 1 - mean - mean_left}
+    row = {
+        'user_id': user_id,
+        'rows': profile['rows'],
+        'visits': profile['visits'],
+        'right_rows': profile['right_rows'],
+        'neutral_rows': profile['neutral_rows'],
+        'left_rows': profile['rows'] - profile['right_rows'] - profile['neutral_rows'],
+        'probability_right': mean,
+        'leaning': max(means, key=means.get) if profile['visits'] else 'neutral',
+        'windows': len(profile['windows']),
+        'first_window': None,
+        'last_window': None,
+        'recent_probability_right': float('nan'),
+        'trend_per_window': float('nan'),
+    }
+    windows = sorted((ordinal, weighted / visits) for ordinal, (visits, weighted) in profile['windows'].items()
+                     if visits)
+    if windows:
+        ordinals = np.array([ordinal for ordinal, _ in windows], dtype=np.float64)
+        means = np.array([value for _, value in windows])
+        row['first_window'] = str(pd.Period(ordinal=windows[0][0], freq=window).start_time.date())
+        row['last_window'] = str(pd.Period(ordinal=windows[-1][0], freq=window).start_time.date())
+        row['recent_probability_right'] = means[-1]
+        # Least-squares slope of the per-window mean: change in probability_right per window
+        if len(windows) > 1:
+            row['trend_per_window'] = np.polyfit(ordinals, means, 1)[0]
+    return row
+
+def batch_score(inputs, output_path='data/processed/user_leaning.csv', model_path='models/logistic_regression.pkl',
+                vectorizer_path='models/tfidf_vectorizer.pkl', bundle_dir=None, clean=True, window='W',
+                chunksize=50_000, max_workers=None):
+    """Score many users' history files in a process pool and write one summary row per user.
+
+    Each worker loads the model once and streams its files in chunks of chunksize rows,
+    returning only per-user running totals, so memory stays bounded however many or
+    large the files are. Inputs may be raw scraper output or preprocessed tables; users
+    come from a user_id column or, failing that, the file name. window is a pandas period
+    alias ('D', 'W', 'M') used for the trend.
+    """
+    try:
+        paths = expand_inputs(inputs)
+        if not paths:
+            raise FileNotFoundError("No input files found")
+        logger.info(f"Scoring {len(paths)} history files with {max_workers or os.cpu_count()} workers")
+        profiles = {}
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                                 initargs=(model_path, vectorizer_path, bundle_dir, clean)) as executor:
+            results = executor.map(score_file, paths, [window] * len(paths), [chunksize] * len(paths))
+            for file_profiles in results:
+                merge_profiles(profiles, file_profiles)
+        summary = pd.DataFrame([summarize_profile(user_id, profile, window)
+                                for user_id, profile in sorted(profiles.items())])
+        write_table(summary, output_path)
+        logger.info(f"Saved leaning summary for {len(summary)} users to {output_path}")
+        return summary
+    except Exception as e:
+        logger.error(f"Batch scoring failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score history files and aggregate a leaning profile per user.")
+    parser.add_argument('inputs', nargs='*', default=['data/raw/user1_history.csv', 'data/raw/user2_history.csv'],
+                        help="History files, glob patterns or directories")
+    parser.add_argument('--output', default='data/processed/user_leaning.csv')
+    parser.add_argument('--model-path', default='models/logistic_regression.pkl')
+    parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl')
+    parser.add_argument('--bundle-dir', help="Load the model from a memory-mapped bundle, shared between workers")
+    parser.add_argument('--no-clean', action='store_true', help="Skip SpaCy cleaning of raw titles and urls")
+    parser.add_argument('--window', default='W', help="Trend window as a pandas period alias")
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: every core)")
+    args = parser.parse_args()
+    batch_score(args.inputs, args.output, args.model_path, args.vectorizer_path, args.bundle_dir,
+                not args.no_clean, args.window, args.chunksize, args.workers)
@@ -0,0 +1,123 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Adjust sys.path to include the src directory and the nlp and models stage directories
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'nlp')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models')))
+
+from utils.logger import setup_logger
+from url_features import featurize_urls
+from vectorizer import compose_text
+
+# Set up logging
+logger = setup_logger('serve_scorer')
+
+# Label values as generate_labels writes them; 2 is labeler.NEUTRAL_LABEL
+LEANINGS = {0: 'left', 1: 'right', 2: 'neutral'}
+
+def as_list(values):
+    """Accept a single string or a sequence of strings and return a list."""
+    if values is None:
+        return None
+    if isinstance(values, str):
+        return [values]
+    return list(values)
+
+class LeaningScorer:
+    """Load the vectorizer and classifier once and score raw titles and urls.
+
+    With bundle_dir set, the model is loaded from a memory-mapped bundle instead of pickles.
+    """
+
+    def __init__(self, model_path='models/logistic_regression.pkl', vectorizer_path='models/tfidf_vectorizer.pkl',
+                 clean=True, bundle_dir=None, url_cleaner='fast'):
+        self.vectorizer = None
+        if bundle_dir:
+            from bundle import load_bundle
+            self.model, self.manifest = load_bundle(bundle_dir)
+        else:
+            with open(model_path, 'rb') as f:
+                self.model = pickle.load(f)
+            logger.info(f"Loaded model from {model_path}")
+        # Bundles and pipelines saved by train_streaming carry their own vectorizer
+        if vectorizer_path and not hasattr(self.model, 'steps'):
+            with open(vectorizer_path, 'rb') as f:
+                self.vectorizer = pickle.load(f)
+            logger.info(f"Loaded vectorizer from {vectorizer_path}")
+        self.url_cleaner = url_cleaner
+        self.clean_columns = None
+        if clean:
+            from preprocess import clean_columns
+            self.clean_columns = clean_columns
+
+    def features(self, titles, urls):
+        """Turn raw titles and urls into the text the model was trained on, as preprocess_history does."""
+        return self.frame_features(pd.DataFrame({'title': titles, 'url': urls}))
+
+    def frame_features(self, df):
+        """Build model input from a history frame; frames already cleaned by preprocess_history skip cleaning."""
+        if 'cleaned_title' not in df.columns:
+            df = df[['title', 'url']].copy()
+            if self.clean_columns is None:
+                df['cleaned_title'] = df['title']
+                df['cleaned_url'] = df['url']
+            elif self.url_cleaner == 'fast':
+                df['cleaned_title'] = self.clean_columns(df, ('title',))['title']
+                df[['cleaned_url', 'domain']] = featurize_urls(df['url'])
+            else:
+                cleaned = self.clean_columns(df, ('title', 'url'))
+                df['cleaned_title'] = cleaned['title']
+                df['cleaned_url'] = cleaned['url']
+        text = compose_text(df)
+        if self.vectorizer is not None:
+            return self.vectorizer.transform(text)
+        return text
+
+    def score(self, features):
+        """Return each row's predicted label and {leaning: probabilities} for every class of the model.
+
+        Labels are the most probable of the model's classes_, so a neutral class is
+        predicted whenever it is most likely. Models without predict_proba, such as a
+        hinge-loss SGD classifier, get 0/1 probabilities from predict.
+        """
+        classes = np.asarray(self.model.classes_)
+        if hasattr(self.model, 'predict_proba'):
+            probabilities = self.model.predict_proba(features)
+            labels = classes[probabilities.argmax(axis=1)]
+        else:
+            labels = np.asarray(self.model.predict(features))
+            probabilities = (labels[:, None] == classes[None, :]).astype(np.float64)
+        return labels, {LEANINGS.get(int(c), str(c)): probabilities[:, i] for i, c in enumerate(classes)}
+
+    def probability_right(self, features):
+        """Return the probability of the right-leaning class for each row of features."""
+        labels, probabilities = self.score(features)
+        return probabilities.get('right', np.zeros(len(labels)))
+
+    def predict_leaning(self, titles, urls=None):
+        """Score one or many (title, url) pairs and return a result dict per pair."""
+        titles = as_list(titles)
+        urls = as_list(urls) or [''] * len(titles)
+        if len(titles) != len(urls):
+            raise ValueError("titles and urls must have the same length")
+        if not titles:
+            return []
+        labels, probabilities = self.score(self.features(titles, urls))
+        right = probabilities.get('right', np.zeros(len(labels)))
+        return [{'label': int(label), 'leaning': LEANINGS.get(int(label), str(label)), 'probability_right': float(p)}
+                for label, p in zip(labels, right)]
+
+_default_scorer = None
+
+def predict_leaning(titles, urls=None, model_path='models/logistic_regression.pkl',
+                    vectorizer_path='models/tfidf_vectorizer.pkl', bundle_dir=None):
+    """Score titles and urls with a scorer that is loaded on first use and then reused."""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = LeaningScorer(model_path, vectorizer_path, bundle_dir=bundle_dir)
+    return _default_scorer.predict_leaning(titles, urls)
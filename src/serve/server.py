@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adjust sys.path to include src directory for the shared logger
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scorer import LeaningScorer
+from utils.logger import setup_logger
+
+# Set up logging
+logger = setup_logger('serve_http')
+
+def string_list(payload, plural, singular):
+    """Read payload[plural] or payload[singular] as a list of strings; None when both are missing."""
+    values = payload.get(plural, payload.get(singular))
+    if values is None:
+        return None
+    if isinstance(values, str):
+        return [values]
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"'{plural}' must be a string or a list of strings")
+    return values
+
+def parse_request(payload):
+    """Validate a /predict JSON payload and return (titles, urls); raises ValueError for a bad request.
+
+    Checking here, before the request is queued, keeps one client's bad input out of
+    the batches other clients' requests are scored in.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    titles = string_list(payload, 'titles', 'title')
+    if titles is None:
+        raise ValueError("Request must contain 'title' or 'titles'")
+    urls = string_list(payload, 'urls', 'url') or [''] * len(titles)
+    if len(titles) != len(urls):
+        raise ValueError("titles and urls must have the same length")
+    return titles, urls
+
+class MicroBatcher:
+    """Collect concurrent scoring requests and score them together in one model call."""
+
+    def __init__(self, scorer, max_batch_size=256, max_wait_ms=5):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, titles, urls):
+        """Queue a request and return a Future that resolves to its results."""
+        future = Future()
+        self.requests.put((titles, urls, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            titles = [title for item in batch for title in item[0]]
+            urls = [url for item in batch for url in item[1]]
+            try:
+                results = self.scorer.predict_leaning(titles, urls)
+            except Exception as e:
+                logger.error(f"Batch scoring failed: {e}; rescoring its {len(batch)} requests one at a time")
+                self._run_each(batch)
+                continue
+            start = 0
+            for item_titles, _, future in batch:
+                future.set_result(results[start:start + len(item_titles)])
+                start += len(item_titles)
+
+    def _run_each(self, batch):
+        """Score each request of a failed batch on its own, so only the request that fails gets its error."""
+        for item_titles, item_urls, future in batch:
+            try:
+                future.set_result(self.scorer.predict_leaning(item_titles, item_urls))
+            except Exception as e:
+                future.set_exception(e)
+
+class ScoringServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for bursts of concurrent clients."""
+    request_queue_size = 128
+
+def make_handler(batcher):
+    """Build a request handler class bound to a MicroBatcher."""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                titles, urls = parse_request(json.loads(self.rfile.read(length) or b'{}'))
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            try:
+                results = batcher.submit(titles, urls).result()
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+            self._send_json(200, {'results': results})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ScoringHandler
+
+def serve(model_path='models/logistic_regression.pkl', vectorizer_path='models/tfidf_vectorizer.pkl',
+          host='127.0.0.1', port=8000, max_batch_size=256, max_wait_ms=5, bundle_dir=None):
+    """Load the model once and serve POST /predict on localhost."""
+    scorer = LeaningScorer(model_path, vectorizer_path, bundle_dir=bundle_dir)
+    batcher = MicroBatcher(scorer, max_batch_size, max_wait_ms)
+    server = ScoringServer((host, port), make_handler(batcher))
+    logger.info(f"Serving political-leaning predictions on http://{host}:{server.server_port}/predict")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve political-leaning predictions over local HTTP.")
+    parser.add_argument('--model-path', default='models/logistic_regression.pkl')
+    parser.add_argument('--vectorizer-path', default='models/tfidf_vectorizer.pkl')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--bundle-dir', help="Load a model bundle instead of the pickled model and vectorizer")
+    args = parser.parse_args()
+    server = serve(args.model_path, args.vectorizer_path, args.host, args.port,
+                   args.max_batch_size, args.max_wait_ms, args.bundle_dir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down server")
+        server.shutdown()
@@ -0,0 +1,276 @@
+import argparse
+import cProfile
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Adjust sys.path to include src directory when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logger import setup_logger
+
+# Set up logging
+logger = setup_logger('metrics')
+
+# Metrics are appended next to the log; PROFILE_STAGES=clean_text,vectorize_text (or 'all') opts stages
+# into profiling, and PROFILER=pyinstrument switches from cProfile when pyinstrument is installed
+DEFAULT_METRICS_FILE = 'logs/metrics.jsonl'
+DEFAULT_PROFILE_DIR = 'logs/profiles'
+RUN_ID = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_local = threading.local()
+_write_lock = threading.Lock()
+# Stages running right now in any thread, so each record can name the stages that overlapped it
+_active = set()
+_active_lock = threading.Lock()
+
+def metrics_path():
+    """Return the metrics file, overridable with the METRICS_FILE environment variable."""
+    return os.environ.get('METRICS_FILE', DEFAULT_METRICS_FILE)
+
+def current_rss_mb():
+    """Resident set size of this process in MiB, or None where it cannot be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def process_peak_rss_mb():
+    """Peak resident set size of this process so far in MiB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+class RssSampler(threading.Thread):
+    """Sample RSS in the background to find the peak reached while one stage runs.
+
+    RSS is process-wide, so the peak includes memory held by any stage running concurrently.
+    """
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+def profiled(stage):
+    """Whether PROFILE_STAGES opts this stage into profiling."""
+    stages = {name.strip() for name in os.environ.get('PROFILE_STAGES', '').split(',') if name.strip()}
+    return 'all' in stages or stage in stages
+
+class StageProfiler:
+    """Profile one stage with cProfile, or pyinstrument when PROFILER=pyinstrument, and save the report."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.kind = os.environ.get('PROFILER', 'cprofile')
+        self.profiler = None
+        if self.kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                self.profiler = Profiler()
+            except ImportError:
+                logger.warning("pyinstrument is not installed; profiling with cProfile instead")
+                self.kind = 'cprofile'
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        """Stop profiling and return the path of the saved report."""
+        profile_dir = os.environ.get('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{self.stage}-{RUN_ID}-{threading.get_ident()}")
+        if self.kind == 'pyinstrument':
+            self.profiler.stop()
+            path += '.html'
+            with open(path, 'w') as f:
+                f.write(self.profiler.output_html())
+        else:
+            self.profiler.disable()
+            path += '.prof'
+            self.profiler.dump_stats(path)
+        return path
+
+class StageTimer:
+    """Time a stage and append one JSON-lines metrics record when it finishes.
+
+    The record holds wall and CPU seconds, rows and rows per second, the peak RSS
+    sampled during the stage and the process peak, plus any annotated fields. Both peaks
+    are for the whole process: concurrent_stages names the stages other threads ran
+    meanwhile, whose memory the peak may include.
+    """
+
+    def __init__(self, stage, rows=None, **fields):
+        self.stage = stage
+        self.rows = rows
+        self.fields = fields
+        self.sampler = None
+        self.profiler = None
+        self.thread = None
+        self.concurrent = set()
+
+    def __enter__(self):
+        _stack().append(self)
+        self.thread = threading.get_ident()
+        with _active_lock:
+            for other in _active:
+                if other.thread != self.thread:
+                    other.concurrent.add(self.stage)
+                    self.concurrent.add(other.stage)
+            _active.add(self)
+        self.sampler = RssSampler()
+        self.sampler.start()
+        if profiled(self.stage):
+            try:
+                self.profiler = StageProfiler(self.stage)
+                self.profiler.start()
+            except ValueError as e:
+                # Only one profiler can be active at a time, e.g. when stages overlap in threads
+                logger.warning(f"Could not profile {self.stage}: {e}")
+                self.profiler = None
+        self.started = datetime.now(timezone.utc)
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start_time
+        cpu_seconds = time.process_time() - self.start_cpu
+        profile_path = self.profiler.stop() if self.profiler else None
+        peak = self.sampler.stop()
+        _stack().remove(self)
+        with _active_lock:
+            _active.discard(self)
+        record = {
+            'run_id': RUN_ID,
+            'stage': self.stage,
+            'started': self.started.isoformat(timespec='milliseconds'),
+            'status': 'ok' if exc_type is None else 'error',
+            'seconds': round(seconds, 6),
+            'cpu_seconds': round(cpu_seconds, 6),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / seconds, 1) if self.rows is not None and seconds > 0 else None,
+            'peak_rss_mb': _round(peak),
+            'process_peak_rss_mb': _round(process_peak_rss_mb()),
+            'concurrent_stages': sorted(self.concurrent),
+            'pid': os.getpid(),
+        }
+        if exc_type is not None:
+            record['error'] = f"{exc_type.__name__}: {exc}"
+        if profile_path:
+            record['profile'] = profile_path
+        record.update(self.fields)
+        write_metrics(record)
+        return False
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def stage_timer(stage, rows=None, **fields):
+    """Context manager form: with stage_timer('clean_text', rows=len(df)): ..."""
+    return StageTimer(stage, rows, **fields)
+
+def timed(stage, rows=None):
+    """Decorator form; rows is an optional callable that counts rows from the return value."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageTimer(stage) as timer:
+                result = func(*args, **kwargs)
+                if rows is not None and timer.rows is None:
+                    timer.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def count_rows(n):
+    """Add n rows to the innermost running stage in this thread."""
+    stack = _stack()
+    if stack:
+        stack[-1].rows = (stack[-1].rows or 0) + int(n)
+
+def annotate(**fields):
+    """Attach extra fields, such as accuracy, to the innermost running stage's record."""
+    stack = _stack()
+    if stack:
+        stack[-1].fields.update(fields)
+
+def write_metrics(record, path=None):
+    """Append one metrics record as a JSON line."""
+    path = path or metrics_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    line = json.dumps(record, default=str)
+    with _write_lock:
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+def load_metrics(path=None):
+    """Read every record from a metrics file."""
+    path = path or metrics_path()
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(path=None):
+    """Print the latest run of each stage against the median of its earlier runs.
+
+    A peak marked * was sampled while other stages ran concurrently, so it is not the stage's alone.
+    """
+    by_stage = {}
+    for record in load_metrics(path):
+        if record.get('status') == 'ok':
+            by_stage.setdefault(record['stage'], []).append(record)
+    print(f"{'stage':<24} {'runs':>5} {'last s':>9} {'median s':>9} {'change':>8} {'rows/s':>12} {'peak MiB':>9}")
+    for stage, records in sorted(by_stage.items()):
+        last = records[-1]
+        baseline = statistics.median(r['seconds'] for r in records[:-1]) if len(records) > 1 else None
+        median = f"{baseline:.3f}" if baseline else '-'
+        change = f"{last['seconds'] / baseline - 1:+.0%}" if baseline else '-'
+        rate = f"{last['rows_per_second']:.0f}" if last.get('rows_per_second') is not None else '-'
+        peak = f"{last['peak_rss_mb']:.0f}" if last.get('peak_rss_mb') is not None else '-'
+        peak += '*' if last.get('concurrent_stages') else ''
+        print(f"{stage:<24} {len(records):>5} {last['seconds']:>9.3f} {median:>9} {change:>8} {rate:>12} {peak:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the latest run of each stage with earlier runs.")
+    parser.add_argument('path', nargs='?', help=f"Metrics file (default: {DEFAULT_METRICS_FILE} or $METRICS_FILE)")
+    summarize(parser.parse_args().path)
@@ -0,0 +1,103 @@
+import os
+
+import pandas as pd
+
+FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+# Heavily repeated string columns stored dictionary-encoded in columnar formats
+DICTIONARY_COLUMNS = ['url', 'domain', 'user_id', 'browser', 'profile']
+
+def table_format(path):
+    """Infer the storage format from a file extension; unknown extensions are treated as CSV."""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow output requires pyarrow (pip install pyarrow)") from e
+
+def table_columns(path):
+    """Return the column names of a table without loading its rows."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+    if fmt == 'parquet':
+        return list(pq.read_schema(path).names)
+    return list(feather.read_table(path, memory_map=True).schema.names)
+
+def read_table(path, columns=None):
+    """Read a CSV, Parquet or Arrow IPC table into a DataFrame."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return pd.read_csv(path, usecols=columns)
+    _require_pyarrow()
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
+    # Decode dictionary columns back to plain strings so downstream .str and concat behave like CSV
+    return _decode_dictionaries(df)
+
+def _decode_dictionaries(df):
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+def iter_table(path, columns=None, chunksize=100_000):
+    """Yield a table in DataFrame chunks of at most chunksize rows without loading it whole."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        return
+    _require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        batches = feather.read_table(path, columns=columns, memory_map=True).to_batches(max_chunksize=chunksize)
+    for batch in batches:
+        yield _decode_dictionaries(batch.to_pandas())
+
+def write_table(df, path):
+    """Write a DataFrame as CSV, Parquet or Arrow IPC depending on the file extension."""
+    fmt = table_format(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return
+    _require_pyarrow()
+    df = df.reset_index(drop=True)
+    for column in DICTIONARY_COLUMNS:
+        if column in df.columns and pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype('category')
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+def append_table(df, path):
+    """Append rows to an existing table, matching its column order; columnar files are rewritten.
+
+    Columns the table lacks are never dropped: the whole table is rewritten with them
+    added after the existing columns, empty for the rows already stored.
+    """
+    if not os.path.exists(path):
+        write_table(df, path)
+        return
+    columns = table_columns(path)
+    if table_format(path) == 'csv' and set(df.columns) <= set(columns):
+        df.reindex(columns=columns).to_csv(path, mode='a', header=False, index=False)
+        return
+    existing = read_table(path)
+    write_table(pd.concat([existing, df.reindex(columns=columns + [c for c in df.columns if c not in columns])],
+                          ignore_index=True), path)